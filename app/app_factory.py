@@ -1,16 +1,39 @@
 import logging
+import os
 
 import dash
 import dash_bootstrap_components as dbc
+import flask_compress
+
+from utils import callback_metrics, concurrency, memoization, profiling, response_cache, single_flight, upload_utils
 
 logger = logging.getLogger("App-factory.py")
 logger.setLevel(logging.INFO)
 
 
 def get_app():
-    application = dash.Dash(__name__, external_stylesheets=[dbc.themes.COSMO], title="EigenVo")
+    concurrency.configure_thread_pools()
+    # compression is set up below, so it runs after the response cache has stored the uncompressed body
+    application = dash.Dash(__name__, external_stylesheets=[dbc.themes.COSMO], title="EigenVo", compress=False)
     application_server = application.server
     application.config.suppress_callback_exceptions = True
+    application_server.config.update(
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_BR_LEVEL=int(os.environ.get("COMPRESS_BR_LEVEL", "5")),
+        COMPRESS_LEVEL=int(os.environ.get("COMPRESS_LEVEL", "6")),
+        COMPRESS_MIN_SIZE=1024,
+        COMPRESS_MIMETYPES=["application/json", "text/html", "text/css", "application/javascript"],
+        # vector uploads arrive base64 encoded in the callback body
+        MAX_CONTENT_LENGTH=upload_utils.max_request_bytes(),
+    )
+
+    # registered first so cached responses are profiled and timed as well
+    profiling.REQUEST_PROFILER.init_app(application_server)
+    callback_metrics.CALLBACK_METRICS.init_app(application_server)
+    callback_metrics.CALLBACK_METRICS.add_collector(memoization.MEMO_CACHE.render)
+    flask_compress.Compress(application_server)
+    response_cache.CALLBACK_RESPONSE_CACHE.init_app(application_server)
+    single_flight.SINGLE_FLIGHT.init_app(application_server)
 
     return application, application_server
 
@@ -1,6 +1,156 @@
+import argparse
+import logging
+import os
+import threading
+from typing import *
+
+import numpy as np
 import pandas as pd
 
+logger = logging.getLogger("covid-data-logger")
+logger.setLevel(logging.INFO)
+
+COVID_DATA_URL = "https://raw.githubusercontent.com/hadrienj/essential_math_for_data_science/master/data/covid19.csv"
+COVID_DATA_SNAPSHOT = os.environ.get(
+    "COVID_DATA_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "covid19.npz")
+)
+DEFAULT_REGION = "Ile-de-France"
+DEFAULT_COMPARE_REGIONS = [DEFAULT_REGION, "Grand Est", "Auvergne-Rhône-Alpes"]
+DATE_COLUMN = "Date"
+DATE_FORMAT = "%Y/%m/%d"
+CHUNK_SIZE = 10_000
+
+
+def ingest_csv(
+        source: str = COVID_DATA_URL,
+        output_path: str = COVID_DATA_SNAPSHOT,
+        chunk_size: int = CHUNK_SIZE
+) -> str:
+    date_chunks = []
+    value_chunks = []
+    regions = None
+
+    # read in chunks so large multi-month / multi-region files never need to be parsed in one go
+    for chunk in pd.read_csv(source, chunksize=chunk_size):
+        if regions is None:
+            regions = [c for c in chunk.columns if c != DATE_COLUMN]
+        date_chunks.append(chunk[DATE_COLUMN].to_numpy(dtype=str))
+        value_chunks.append(chunk[regions].to_numpy(dtype=np.float64))
+
+    if regions is None:
+        raise ValueError(f"No rows found in {source}.")
+
+    dates = np.concatenate(date_chunks)
+    values = np.concatenate(value_chunks)
+
+    # days are counted from the first of the month of the earliest record,
+    # which is the day of the month for single-month datasets
+    parsed_dates = pd.to_datetime(dates, format=DATE_FORMAT)
+    start = parsed_dates.min().replace(day=1)
+    days = ((parsed_dates - start).days + 1).to_numpy(dtype=np.int64)
+
+    # store one contiguous row per region, written atomically since several workers may ingest at once
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(
+            f,
+            dates=dates,
+            days=days,
+            regions=np.array(regions, dtype=str),
+            values=np.ascontiguousarray(values.T)
+        )
+    os.replace(temp_path, output_path)
+    logger.info(f"Ingested {len(dates)} rows and {len(regions)} regions from {source} into {output_path}")
+    return output_path
+
+
+class CovidDataStore:
+    def __init__(
+            self,
+            snapshot_path: str = COVID_DATA_SNAPSHOT,
+            source: str = COVID_DATA_URL
+    ):
+        self.snapshot_path = snapshot_path
+        self.source = source
+        self._arrays = None
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        if self._arrays is not None:
+            return self._arrays
+
+        with self._lock:
+            if self._arrays is None:
+                if not os.path.exists(self.snapshot_path):
+                    logger.warning(f"No snapshot at {self.snapshot_path}, ingesting from {self.source}")
+                    ingest_csv(self.source, self.snapshot_path)
+
+                with np.load(self.snapshot_path, allow_pickle=False) as snapshot:
+                    arrays = {key: snapshot[key] for key in snapshot.files}
+                arrays['region_index'] = {r: i for i, r in enumerate(arrays['regions'].tolist())}
+                self._arrays = arrays
+
+        return self._arrays
+
+    @property
+    def regions(self) -> List[str]:
+        return self._load()['regions'].tolist()
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._load()['days']
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._load()['dates']
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._load()['values']
+
+    def region(self, name: str) -> np.ndarray:
+        arrays = self._load()
+        return arrays['values'][arrays['region_index'][name]]
+
+    def client_columns(self) -> dict:
+        # the compact form kept in the browser, counts are whole numbers so they go out as ints
+        arrays = self._load()
+        values = arrays['values']
+        if np.all(values == np.rint(values)):
+            values = values.astype(np.int64)
+        return {
+            "days": arrays['days'].tolist(),
+            "regions": {r: values[i].tolist() for i, r in enumerate(self.regions)},
+        }
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            arrays = self._load()
+            columns = {DATE_COLUMN: arrays['dates']}
+            columns.update({r: self.region(r) for r in self.regions})
+            columns['days'] = arrays['days']
+            self._frame = pd.DataFrame(columns)
+        return self._frame
+
+
+COVID_DATA = CovidDataStore()
+
+
+def __getattr__(name: str):
+    # keep COVID_DATA_DF available without loading anything at import time
+    if name == "COVID_DATA_DF":
+        return COVID_DATA.frame
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-COVID_DATA_DF = pd.read_csv("https://raw.githubusercontent.com/hadrienj/essential_math_for_data_science/master/data/covid19.csv")
-COVID_DATA_DF['days'] = COVID_DATA_DF["Date"].str.split("/").apply(lambda x: x[2]).astype(int)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest the COVID dataset into a local snapshot.")
+    parser.add_argument("--source", default=COVID_DATA_URL)
+    parser.add_argument("--output", default=COVID_DATA_SNAPSHOT)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    arguments = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO)
+    ingest_csv(arguments.source, arguments.output, arguments.chunk_size)
@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from typing import *
+
+import numpy as np
+
+from assets.data import covid_data
+from utils import fit_executor, regression_utils
+
+logger = logging.getLogger("poly-fits-logger")
+logger.setLevel(logging.INFO)
+
+POLY_FIT_ALPHAS = [0.0, 1.0, 100.0, 1000.0, 5000.0, 10000.0]
+POLY_FIT_KINDS = ["lasso", "ridge"]
+POLY_FIT_BASES = list(regression_utils.BASIS_VANDER)
+POLY_FIT_MAX_DEGREE = int(os.environ.get("POLY_FIT_MAX_DEGREE", "15"))
+POLY_FIT_MAX_ITER = 2000
+POLY_FIT_CV_FOLDS = int(os.environ.get("POLY_FIT_CV_FOLDS", "5"))
+# every entry holds all regions for one (degree, kind, basis), a few tens of kB each
+POLY_FIT_CACHE_ENTRIES = int(os.environ.get("POLY_FIT_CACHE_ENTRIES", "128"))
+POLY_FIT_ARTIFACT = os.environ.get(
+    "POLY_FIT_ARTIFACT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "poly_fits.npy")
+)
+
+
+def data_fingerprint(store: covid_data.CovidDataStore = covid_data.COVID_DATA) -> str:
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(store.days).tobytes())
+    digest.update(np.ascontiguousarray(store.values).tobytes())
+    return digest.hexdigest()
+
+
+def metadata_path(artifact_path: str) -> str:
+    return f"{os.path.splitext(artifact_path)[0]}.json"
+
+
+def precompute(
+        output_path: str = POLY_FIT_ARTIFACT,
+        max_degree: int = POLY_FIT_MAX_DEGREE,
+        store: covid_data.CovidDataStore = covid_data.COVID_DATA
+) -> str:
+    regions = store.regions
+    days = store.days
+    n_alphas = len(POLY_FIT_ALPHAS)
+
+    # each entry holds [coefficients padded to max_degree, intercept, predictions for every day]
+    width = max_degree + 1 + len(days)
+    shape = (len(regions), max_degree, len(POLY_FIT_BASES), len(POLY_FIT_KINDS), n_alphas, width)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    artifact = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float64, shape=shape)
+
+    with warnings.catch_warnings():
+        # alpha = 0 makes lasso warn about convergence on every fit
+        warnings.simplefilter("ignore")
+        for r, region in enumerate(regions):
+            y = store.region(region)
+            for degree in range(1, max_degree + 1):
+                for b, basis in enumerate(POLY_FIT_BASES):
+                    for k, kind in enumerate(POLY_FIT_KINDS):
+                        coefs, intercepts, predictions = regression_utils.poly_fit_path(
+                            days, y, degree, kind, POLY_FIT_ALPHAS, basis=basis, max_iter=POLY_FIT_MAX_ITER
+                        )
+                        entry = artifact[r, degree - 1, b, k]
+                        entry[:, :degree] = coefs
+                        entry[:, max_degree] = intercepts
+                        entry[:, max_degree + 1:] = predictions
+            logger.info(f"Precomputed fits for {region}")
+
+    artifact.flush()
+    del artifact
+    os.replace(temp_path, output_path)
+
+    metadata = {
+        "regions": regions,
+        "bases": POLY_FIT_BASES,
+        "kinds": POLY_FIT_KINDS,
+        "alphas": POLY_FIT_ALPHAS,
+        "max_degree": max_degree,
+        "n_days": len(days),
+        "fingerprint": data_fingerprint(store),
+    }
+    with open(metadata_path(output_path), "w") as f:
+        json.dump(metadata, f)
+
+    logger.info(f"Wrote {shape} fit artifact to {output_path}")
+    return output_path
+
+
+class PolyFitArtifact:
+    def __init__(
+            self,
+            artifact_path: str = POLY_FIT_ARTIFACT,
+            store: covid_data.CovidDataStore = covid_data.COVID_DATA
+    ):
+        self.artifact_path = artifact_path
+        self.store = store
+        self._loaded = False
+        self._values = None
+        self._metadata = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return self._values
+
+        with self._lock:
+            if not self._loaded:
+                self._values, self._metadata = self._read()
+                self._loaded = True
+
+        return self._values
+
+    def _read(self) -> Tuple[Optional[np.ndarray], Optional[dict]]:
+        if not os.path.exists(self.artifact_path) or not os.path.exists(metadata_path(self.artifact_path)):
+            logger.info(f"No fit artifact at {self.artifact_path}, fits will be computed live.")
+            return None, None
+
+        with open(metadata_path(self.artifact_path)) as f:
+            metadata = json.load(f)
+
+        stale = metadata.get('bases') != POLY_FIT_BASES or metadata['fingerprint'] != data_fingerprint(self.store)
+        if stale:
+            logger.warning(f"Fit artifact at {self.artifact_path} is stale, fits will be computed live.")
+            return None, None
+
+        metadata['region_index'] = {r: i for i, r in enumerate(metadata['regions'])}
+        metadata['basis_index'] = {b: i for i, b in enumerate(metadata['bases'])}
+        metadata['kind_index'] = {k: i for i, k in enumerate(metadata['kinds'])}
+        return np.load(self.artifact_path, mmap_mode="r"), metadata
+
+    def lookup(
+            self,
+            region: str,
+            degree: int,
+            kind: str,
+            alphas: Sequence[float],
+            basis: str = "monomial"
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        values = self._load()
+        if values is None:
+            return None
+
+        metadata = self._metadata
+        max_degree = metadata['max_degree']
+        region_index = metadata['region_index'].get(region)
+        basis_index = metadata['basis_index'].get(basis.lower())
+        kind_index = metadata['kind_index'].get(kind.lower())
+        in_grid = (
+            region_index is not None
+            and basis_index is not None
+            and kind_index is not None
+            and degree == int(degree)
+            and 1 <= degree <= max_degree
+            and list(alphas) == metadata['alphas']
+        )
+        if not in_grid:
+            return None
+
+        degree = int(degree)
+        entry = values[region_index, degree - 1, basis_index, kind_index]
+        return entry[:, :degree], entry[:, max_degree], entry[:, max_degree + 1:]
+
+    def lookup_regions(
+            self,
+            degree: int,
+            kind: str,
+            alphas: Sequence[float],
+            basis: str = "monomial"
+    ) -> Optional[np.ndarray]:
+        # predictions of every region as (regions, alphas, days), in the store's region order
+        regions = self.store.regions
+        fits = [self.lookup(region, degree, kind, alphas, basis=basis) for region in regions]
+        if any(fit is None for fit in fits):
+            return None
+        return np.stack([predictions for _, _, predictions in fits])
+
+
+POLY_FITS = PolyFitArtifact()
+
+
+class RegionFits:
+    def __init__(
+            self,
+            store: covid_data.CovidDataStore = covid_data.COVID_DATA,
+            artifact: PolyFitArtifact = POLY_FITS,
+            max_entries: int = POLY_FIT_CACHE_ENTRIES
+    ):
+        self.store = store
+        self.artifact = artifact
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(degree: int, kind: str, basis: str) -> Tuple[int, str, str]:
+        return int(degree), kind.lower(), basis.lower()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, degree: int, kind: str, basis: str = "monomial") -> bool:
+        with self._lock:
+            return self.make_key(degree, kind, basis) in self._entries
+
+    def predictions(
+            self,
+            degree: int,
+            kind: str,
+            basis: str = "monomial",
+            executor: Optional[Any] = None
+    ) -> np.ndarray:
+        key = self.make_key(degree, kind, basis)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # the design matrix only depends on the days, so all regions are fitted as one target matrix
+        timeouts = fit_executor.thread_timeouts()
+        predictions = self.artifact.lookup_regions(degree, kind, POLY_FIT_ALPHAS, basis=basis)
+        if predictions is None:
+            _, _, predictions = regression_utils.batch_poly_fit_path(
+                self.store.days,
+                self.store.values.T,
+                degree,
+                kind,
+                POLY_FIT_ALPHAS,
+                basis=basis,
+                max_iter=POLY_FIT_MAX_ITER,
+                executor=executor
+            )
+            predictions = predictions.transpose(1, 0, 2)
+        predictions = np.ascontiguousarray(predictions)
+        predictions.setflags(write=False)
+
+        # blocks that timed out are nan, they are shown this once and fitted again on the next request
+        if fit_executor.thread_timeouts() != timeouts:
+            return predictions
+
+        with self._lock:
+            self._entries[key] = predictions
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return predictions
+
+    def region(
+            self,
+            region: str,
+            degree: int,
+            kind: str,
+            basis: str = "monomial",
+            executor: Optional[Any] = None
+    ) -> np.ndarray:
+        # (alphas, days) for one region
+        return self.predictions(degree, kind, basis, executor=executor)[self.store.regions.index(region)]
+
+
+REGION_FITS = RegionFits()
+
+
+def poly_fit_job(
+        region: str,
+        degree: int,
+        kind: str,
+        basis: str = "monomial"
+) -> Iterator[Tuple[int, List[float]]]:
+    # background job task, yields each alpha's prediction curve as soon as it is fitted
+    x_raw = covid_data.COVID_DATA.days
+    y = covid_data.COVID_DATA.region(region)
+    x_poly = regression_utils.basis_features(x_raw, degree, basis)
+
+    if kind.lower() == "lasso":
+        steps = regression_utils.lasso_path_steps(x_poly, y, POLY_FIT_ALPHAS, max_iter=POLY_FIT_MAX_ITER)
+    else:
+        coefs, intercepts = regression_utils.ridge_path(x_poly, y, POLY_FIT_ALPHAS)
+        steps = zip(range(len(POLY_FIT_ALPHAS)), coefs, intercepts)
+
+    for i, coef, intercept in steps:
+        yield int(i), (x_poly @ coef + intercept).tolist()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Precompute polynomial fits for every region, degree, basis, model and alpha."
+    )
+    parser.add_argument("--output", default=POLY_FIT_ARTIFACT)
+    parser.add_argument("--max-degree", type=int, default=POLY_FIT_MAX_DEGREE)
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    precompute(arguments.output, arguments.max_degree)
@@ -0,0 +1,49 @@
+// figures for the covid section are assembled here from the covid-data-store columns,
+// so the server only sends model outputs
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    covid: {
+        scatterFigure: function (region, store, figure) {
+            if (!store || !figure || !store.regions[region]) {
+                return window.dash_clientside.no_update;
+            }
+
+            const trace = Object.assign({}, figure.data[0], {
+                x: store.days,
+                y: store.regions[region],
+                hovertemplate: "days=%{x}<br>" + region + "=%{y}<extra></extra>"
+            });
+            delete trace.x0;
+            delete trace.dx;
+
+            const layout = Object.assign({}, figure.layout, {
+                title: Object.assign({}, figure.layout.title, {
+                    text: "March 2020 Covid cases by day in " + region + " region"
+                }),
+                yaxis: Object.assign({}, figure.layout.yaxis, {
+                    title: Object.assign({}, (figure.layout.yaxis || {}).title, {text: region})
+                })
+            });
+            return {data: [trace], layout: layout};
+        },
+
+        polyFitFigure: function (fit, store, figure) {
+            if (!fit || !store || !figure || !store.regions[fit.region]) {
+                return window.dash_clientside.no_update;
+            }
+
+            // every subplot holds the predictions for one alpha followed by the actual cases
+            const data = figure.data.map(function (trace, i) {
+                const updated = Object.assign({}, trace, {x: store.days});
+                delete updated.x0;
+                delete updated.dx;
+                updated.y = i % 2 === 0 ? fit.predictions[Math.floor(i / 2)] : store.regions[fit.region];
+                return updated;
+            });
+
+            const layout = Object.assign({}, figure.layout, {
+                title: Object.assign({}, figure.layout.title, {text: fit.title})
+            });
+            return {data: data, layout: layout};
+        }
+    }
+});
@@ -0,0 +1,11 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    norms: {
+        // the plot keeps using the uploaded vector until a new one is typed
+        vectorSource: function (vector, upload) {
+            const triggered = window.dash_clientside.callback_context.triggered.map(function (t) {
+                return t.prop_id;
+            });
+            return upload && triggered.indexOf("p-vs-norm-upload-key.data") >= 0 ? "upload" : "typed";
+        }
+    }
+});
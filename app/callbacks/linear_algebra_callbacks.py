@@ -1,38 +1,104 @@
+import os
+import time
+
 import numpy as np
-from numpy import linalg
-from dash.dependencies import Input, Output, State
+import dash
+from dash.dependencies import ClientsideFunction, Input, Output, State
 from dash.exceptions import PreventUpdate
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 import plotly.express as px
-from sklearn.linear_model import Lasso, Ridge
-from sklearn import preprocessing
 
 from app_factory import app
-from utils import data_utils, math_utils
-from assets.data.covid_data import COVID_DATA_DF
+from utils import (
+    callback_metrics, data_utils, decorators, fit_executor, job_queue, math_utils, payload_utils, regression_utils,
+    prerender, response_cache, upload_utils
+)
+from assets.data import covid_data, poly_fits
+
+POLY_FIT_TASK = "assets.data.poly_fits:poly_fit_job"
+BACKGROUND_MIN_DEGREE = int(os.environ.get("BACKGROUND_MIN_DEGREE", "8"))
+
+
+@app.callback(
+    Output(component_id="p-vs-norm-upload-key", component_property="data"),
+    Input(component_id="p-vs-norm-upload", component_property="contents"),
+    State(component_id="p-vs-norm-upload", component_property="filename"),
+    prevent_initial_call=True
+)
+@decorators.timed_callback
+def p_vs_norm_upload(upload_contents: str, upload_filename: str = None):
+    # the only request that carries the file, the plot is then drawn from the key
+    if upload_contents is None:
+        raise PreventUpdate
+    # a cached response would skip storing the vector again once it has expired on the server
+    response_cache.no_store()
+
+    try:
+        with callback_metrics.CALLBACK_METRICS.phase("parse"):
+            key, vector = upload_utils.UPLOADS.put(upload_contents, upload_filename)
+    except ValueError as e:
+        return {"filename": upload_filename, "error": str(e), "uploaded": time.time()}
+    # every upload is a new request for the plot, even of a file that was uploaded before
+    return {"key": key, "filename": upload_filename, "size": int(vector.size), "uploaded": time.time()}
+
+
+# remembers whether the vector was typed or uploaded last, so moving the slider keeps using that one
+app.clientside_callback(
+    ClientsideFunction(namespace="norms", function_name="vectorSource"),
+    Output(component_id="p-vs-norm-source", component_property="data"),
+    Input(component_id="p-vs-norm-vector-input", component_property="value"),
+    Input(component_id="p-vs-norm-upload-key", component_property="data"),
+    prevent_initial_call=True
+)
 
 
 @app.callback(
     Output(component_id="p-vs-norm-plot", component_property="figure"),
+    Output(component_id="p-vs-norm-upload-status", component_property="children"),
     Input(component_id="p-vs-norm-vector-input", component_property="value"),
     Input(component_id="p-vs-norm-range-slider", component_property="value"),
+    Input(component_id="p-vs-norm-source", component_property="data"),
+    State(component_id="p-vs-norm-upload-key", component_property="data"),
+    prevent_initial_call=True
 )
-def p_vs_norm_plot(vector_as_string: str, p_values: list):
-    vector = data_utils.string_to_numpy(vector_as_string)
-    p_values = list(range(p_values[0], p_values[-1]))
+@decorators.timed_callback
+@decorators.memoized(key_on_triggered=False)
+@decorators.coalesced_callback(supersede_on=["p-vs-norm-vector-input.value"])
+def p_vs_norm_plot(vector_as_string: str, p_values: list, source: str = "typed", upload: dict = None):
+    if source != "upload" or not upload:
+        return prerender.FIGURES.figure("p-vs-norm-plot", vector_as_string, p_values), None
+
+    filename = upload.get("filename")
+    if "error" in upload:
+        return dash.no_update, f"Could not read {filename}: {upload['error']}"
+
+    vector = upload_utils.UPLOADS.get(upload["key"])
+    if vector is None:
+        return dash.no_update, f"{filename} is no longer on the server, upload it again"
+
+    fig = p_vs_norm_vector_figure(vector, list(range(p_values[0], p_values[-1])))
+    return payload_utils.slim_figure(fig.to_dict()), f"Using the {vector.size:,} entries of {filename}"
+
+
+def p_vs_norm_figure(vector_as_string: str, p_values: list):
+    with callback_metrics.CALLBACK_METRICS.phase("parse"):
+        vector = data_utils.string_to_numpy(vector_as_string)
+        p_values = list(range(p_values[0], p_values[-1]))
     if vector is None:
         vector = np.array([1])
 
+    return p_vs_norm_vector_figure(vector, p_values)
+
+
+def p_vs_norm_vector_figure(vector: np.ndarray, p_values: list):
     if vector is None or p_values is None:
         x_data = [0]
         y_data = [0]
     else:
-        norms = np.zeros(len(p_values))
-        for i, p in enumerate(p_values):
-            norms[i] = linalg.norm(vector, ord=p)
         x_data = p_values
-        y_data = norms
+        with callback_metrics.CALLBACK_METRICS.phase("compute"):
+            y_data = math_utils.lp_norms(vector, p_values)
 
     fig = go.Figure(data=go.Scatter(x=x_data, y=y_data, line=dict(color="#e3506f")))
     fig.update_layout(
@@ -45,74 +111,231 @@ def p_vs_norm_plot(vector_as_string: str, p_values: list):
 
 @app.callback(
     Output(component_id="p-isolines-plot", component_property="figure"),
-    Input(component_id="p-isoline-input", component_property="value")
+    Input(component_id="p-isoline-input", component_property="value"),
+    Input(component_id="isoline-mode-selector", component_property="value"),
+    Input(component_id="p-isolines-plot", component_property="relayoutData"),
+    prevent_initial_call=True
 )
-def p_isoline_plot(p):
-    if not p:
-        p = 1
+@decorators.timed_callback
+def p_isoline_plot(p, mode: str = "parametric", relayout_data: dict = None):
+    # the graph reports relayout events such as autosize on first paint, only zooming matters here
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    viewport_only = triggered == ["p-isolines-plot.relayoutData"]
+    if viewport_only and not data_utils.is_viewport_change(relayout_data):
+        raise PreventUpdate
 
-    x = np.linspace(-5, 5, num=500)
-    y = np.linspace(-5, 5, num=500)
+    # the parametric figure is the same at every zoom level, so the viewport stays out of its memo and prerender keys
+    if not isoline_uses_viewport(p, mode):
+        if viewport_only:
+            raise PreventUpdate
+        relayout_data = None
 
-    xx, yy = np.meshgrid(x, y)
+    return p_isoline_update(p, mode, relayout_data)
 
-    r = np.power(np.abs(xx), p) + np.power(np.abs(yy), p)
 
-    fig = go.Figure()
-    fig.add_trace(go.Contour(z=r, x=x, y=y, colorscale="PuRd"))
+@decorators.memoized(key_on_triggered=False)
+@decorators.coalesced_callback(supersede_on=["p-isoline-input.value"])
+def p_isoline_update(p, mode: str = "parametric", relayout_data: dict = None):
+    return prerender.FIGURES.figure("p-isolines-plot", p, mode, relayout_data)
+
+
+def isoline_uses_viewport(p, mode: str) -> bool:
+    # only the grid figure is evaluated over the visible window, p <= 0 has no parametric form
+    return mode == "grid" or (p or 1) <= 0
+
+
+def p_isoline_figure(p, mode: str = "parametric", relayout_data: dict = None):
+    if not p:
+        p = 1
+
+    if isoline_uses_viewport(p, mode):
+        with callback_metrics.CALLBACK_METRICS.phase("parse"):
+            x_range = data_utils.relayout_to_range(relayout_data, "xaxis", (-5, 5))
+            y_range = data_utils.relayout_to_range(relayout_data, "yaxis", (-5, 5))
+        fig = isoline_grid_figure(p, x_range, y_range)
+    else:
+        fig = isoline_parametric_figure(p)
 
     fig.update_layout(
         title=f"Iso-lines for p = {p} in 2D.",
         xaxis_title=r"x_0",
-        yaxis_title=r"x_1"
+        yaxis_title=r"x_1",
+        # keep the user's zoom when the refined figure comes back
+        uirevision="p-isolines"
     )
 
     return fig
 
 
-@app.callback(
+def isoline_grid_figure(p, x_range=(-5, 5), y_range=(-5, 5)):
+    # only evaluate the visible window, at a resolution that follows the zoom level
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        x, y, r = math_utils.lp_grid_window(p, x_range, y_range)
+
+    fig = go.Figure()
+    fig.add_trace(go.Contour(z=r, x=x, y=y, colorscale="PuRd"))
+    return fig
+
+
+def isoline_parametric_figure(p, n_levels: int = 10, n_points: int = 400):
+    # each level is the set of points with Lp norm equal to the radius
+    radii = np.linspace(5 / n_levels, 5, num=n_levels)
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        xs, ys = math_utils.superellipse_isolines(p, radii, n_points=n_points)
+
+    colors = px.colors.sequential.PuRd
+    fig = go.Figure()
+    for i, (radius, x, y) in enumerate(zip(radii, xs, ys)):
+        color = colors[round(i * (len(colors) - 1) / max(n_levels - 1, 1))]
+        fig.add_trace(go.Scatter(x=x, y=y, mode="lines", line=dict(color=color), name=f"norm = {radius:g}"))
+
+    fig.update_xaxes(range=[-5, 5])
+    fig.update_yaxes(range=[-5, 5], scaleanchor="x", scaleratio=1)
+    return fig
+
+
+# the browser already holds every region's column in covid-data-store, so switching regions needs no request
+app.clientside_callback(
+    ClientsideFunction(namespace="covid", function_name="scatterFigure"),
     Output(component_id="covid-data-scatter", component_property="figure"),
-    Input(component_id="covid-data-region-selector", component_property="value")
+    Input(component_id="covid-data-region-selector", component_property="value"),
+    State(component_id="covid-data-store", component_property="data"),
+    State(component_id="covid-data-scatter", component_property="figure"),
+    prevent_initial_call=True
 )
-def covid_data_day_vs_region(region: str):
+
+
+def covid_data_scatter_figure(region: str):
     title = f"March 2020 Covid cases by day in {region} region"
-    fig = px.scatter(COVID_DATA_DF, x="days", y=region, title=title)
+    fig = px.scatter(covid_data.COVID_DATA_DF, x="days", y=region, title=title)
 
     return fig
 
+
 @app.callback(
-    Output("covid-poly-fit-plot", "figure"),
+    Output("poly-fit-predictions", "data"),
+    Output("poly-fit-job", "data"),
+    Output("poly-fit-job-poller", "disabled"),
     Input("covid-data-region-selector", "value"),
     Input("poly-degree-input", "value"),
     # Input("alpha-range-slider", "value"),
-    Input("kind-value-selector", "value")
+    Input("kind-value-selector", "value"),
+    Input("poly-basis-selector", "value"),
+    Input("poly-fit-job-poller", "n_intervals"),
+    State("poly-fit-job", "data"),
+    prevent_initial_call=True
 )
-def covid_data_poly_fit(region: str, degree: int, kind: str):
+@decorators.timed_callback
+@decorators.coalesced_callback(supersede_on=["poly-degree-input.value"])
+def covid_data_poly_fit(region: str, degree: int, kind: str, basis: str, n_intervals: int = None, job: dict = None):
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    if triggered == ["poly-fit-job-poller.n_intervals"]:
+        if not job:
+            raise PreventUpdate
+        return poll_poly_fit_job(job)
+
+    degree = degree or 2
+    basis = basis or "monomial"
+    if not runs_in_background(region, degree, kind, basis):
+        with callback_metrics.CALLBACK_METRICS.phase("compute"):
+            all_predictions = poly_fits.REGION_FITS.region(
+                region, degree, kind, basis, executor=fit_executor.FIT_EXECUTOR
+            )
+        return poly_fit_predictions(region, degree, kind, basis, all_predictions), None, True
+
+    # slow fits go to the job workers, the poller fills in the panels as they finish
+    params = {"region": region, "degree": int(degree), "kind": kind, "basis": basis}
+    job = {"id": job_queue.JOB_STORE.submit(POLY_FIT_TASK, params, len(poly_fits.POLY_FIT_ALPHAS)), **params}
+    return poll_poly_fit_job(job)
+
+
+def runs_in_background(region: str, degree: int, kind: str, basis: str) -> bool:
+    if job_queue.JOB_WORKERS <= 0 or kind.lower() != "lasso" or degree < BACKGROUND_MIN_DEGREE:
+        return False
+    if poly_fits.REGION_FITS.cached(degree, kind, basis):
+        return False
+    return poly_fits.POLY_FITS.lookup(region, degree, kind, poly_fits.POLY_FIT_ALPHAS, basis=basis) is None
+
+
+def poll_poly_fit_job(job: dict):
+    # the answer changes as the job runs and a failed job must be resubmitted, so none of it is cached
+    response_cache.no_store()
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        status, parts = job_queue.JOB_STORE.result(job['id'])
+    n_alphas = len(poly_fits.POLY_FIT_ALPHAS)
+    n_days = len(covid_data.COVID_DATA.days)
+
+    all_predictions = np.full((n_alphas, n_days), np.nan)
+    for part, predictions in parts.items():
+        all_predictions[part] = predictions
+
+    finished = status not in ("pending", "running")
+    progress = None if status == "done" else f"{len(parts)} of {n_alphas} fits {'done' if finished else 'ready'}"
+    fit = poly_fit_predictions(job['region'], job['degree'], job['kind'], job['basis'], all_predictions, progress)
+    return fit, (None if finished else job), finished
+
+
+def poly_fit_predictions(
+        region: str,
+        degree: int,
+        kind: str,
+        basis: str,
+        all_predictions: np.ndarray,
+        progress: str = None
+) -> dict:
+    # only the model output goes over the wire, the figure is assembled in the browser from covid-data-store
+    return {
+        "region": region,
+        "title": poly_fit_title(degree, kind, basis, progress),
+        "predictions": payload_utils.compact_array(np.asarray(all_predictions)),
+    }
+
+
+def poly_fit_title(degree: int, kind: str, basis: str, progress: str = None) -> str:
+    title = f"Degree {degree} {basis.capitalize()} Polynomial Features with {kind} regression."
+    if progress is not None:
+        title = f"{title} ({progress})"
+    return title
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="covid", function_name="polyFitFigure"),
+    Output("covid-poly-fit-plot", "figure"),
+    Input("poly-fit-predictions", "data"),
+    State("covid-data-store", "data"),
+    State("covid-poly-fit-plot", "figure"),
+    prevent_initial_call=True
+)
+
+
+def covid_poly_fit_figure(region: str, degree: int, kind: str, basis: str):
     if not degree:
         degree = 2
 
-    alphas = ["0", "1", "100", "1000", "5000", "10000"]
-    alphas = [float(a) for a in alphas]
+    if not basis:
+        basis = "monomial"
 
-    # keep the untransformed values for future use
-    x_raw = COVID_DATA_DF['days'].to_numpy().reshape(-1, 1)
-    y_raw = COVID_DATA_DF[region].to_numpy()
+    # precomputed fits when available, otherwise every region is fitted at once and cached,
+    # so switching regions afterwards costs nothing
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        all_predictions = poly_fits.REGION_FITS.region(
+            region, degree, kind, basis, executor=fit_executor.FIT_EXECUTOR
+        )
 
-    # standardize to have mean of 0 and std of 1
-    st_scaler = preprocessing.StandardScaler()
-    x = st_scaler.fit_transform(x_raw)
-    y = y_raw.copy()
-    # y = st_scaler.fit_transform(y_raw.reshape((-1, 1))).flatten()
+    return covid_poly_fit_subplots(region, degree, kind, basis, all_predictions)
 
-    # transform features into n-degree polynomial space
-    poly = preprocessing.PolynomialFeatures(degree, include_bias=False)
-    x_poly = poly.fit_transform(x)
 
-    # select which model to use
-    model_selector = {
-        "lasso": Lasso,
-        "ridge": Ridge,
-    }
+def covid_poly_fit_subplots(
+        region: str,
+        degree: int,
+        kind: str,
+        basis: str,
+        all_predictions: np.ndarray,
+        progress: str = None
+):
+    alphas = poly_fits.POLY_FIT_ALPHAS
+    x_raw = covid_data.COVID_DATA.days.reshape(-1, 1)
+    y_raw = covid_data.COVID_DATA.region(region)
 
     fig = make_subplots(
         rows=len(alphas) // 2,
@@ -122,15 +345,10 @@ def covid_data_poly_fit(region: str, degree: int, kind: str):
     )
 
     x_axis = x_raw.copy()
-    x_axis_scaled = st_scaler.transform(x_axis)
-    x_axis_poly = poly.transform(x_axis_scaled)
 
     row_column_permutations = math_utils.row_column_permutations(len(alphas) // 2, 2)
-    for i, alpha in enumerate(alphas):
+    for i, predictions in enumerate(all_predictions):
         row, col = row_column_permutations[i]
-        model = model_selector.get(kind.lower())(alpha=alpha, max_iter=2000)
-        model.fit(x_poly, y)
-        predictions = model.predict(x_axis_poly)
         fig.add_trace(go.Scatter(x=np.round(x_axis, 2)[:, 0], y=predictions, mode="lines"), row=row, col=col)
         fig.add_trace(
             go.Scatter(
@@ -149,8 +367,162 @@ def covid_data_poly_fit(region: str, degree: int, kind: str):
 
     fig.update_layout(
         height=1200,
-        title_text=f"Degree {degree} Polynomial Features with {kind} regression.",
+        title_text=poly_fit_title(degree, kind, basis, progress),
+        showlegend=False
+    )
+
+    return fig
+
+
+@app.callback(
+    Output("covid-region-compare-plot", "figure"),
+    Input("covid-compare-region-selector", "value"),
+    Input("poly-degree-input", "value"),
+    Input("kind-value-selector", "value"),
+    Input("poly-basis-selector", "value"),
+    Input("compare-alpha-selector", "value"),
+    prevent_initial_call=True
+)
+@decorators.timed_callback
+@decorators.memoized(
+    key_on_triggered=False, depends_on=[covid_data.COVID_DATA_SNAPSHOT, poly_fits.POLY_FIT_ARTIFACT]
+)
+@decorators.coalesced_callback(supersede_on=["poly-degree-input.value"])
+def covid_data_region_compare(regions: list, degree: int, kind: str, basis: str, alpha: str):
+    return prerender.FIGURES.figure(
+        "covid-region-compare-plot", sorted(regions or []), degree or 2, kind, basis or "monomial", float(alpha or 0)
+    )
+
+
+def covid_region_compare_figure(regions: list, degree: int, kind: str, basis: str, alpha: float):
+    alphas = poly_fits.POLY_FIT_ALPHAS
+    alpha_index = alphas.index(alpha) if alpha in alphas else 0
+    days = covid_data.COVID_DATA.days
+
+    # one cached batch holds every region's curves, overlaying more regions adds no fitting
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        all_predictions = poly_fits.REGION_FITS.predictions(degree, kind, basis, executor=fit_executor.FIT_EXECUTOR)
+
+    all_regions = covid_data.COVID_DATA.regions
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, region in enumerate(regions):
+        if region not in all_regions:
+            continue
+        color = colors[i % len(colors)]
+        region_index = all_regions.index(region)
+        fig.add_trace(go.Scatter(
+            x=days, y=all_predictions[region_index, alpha_index], mode="lines", line={"color": color}, name=region
+        ))
+        fig.add_trace(go.Scatter(
+            x=days,
+            y=covid_data.COVID_DATA.values[region_index],
+            mode="markers",
+            marker={"color": color, "size": 6, "opacity": 0.5},
+            name=f"{region} (actual)",
+            showlegend=False
+        ))
+
+    fig.update_layout(
+        title=f"Degree {degree} {basis.capitalize()} {kind} fits with alpha {alphas[alpha_index]:g} by region",
+        xaxis_title="Day",
+        yaxis_title="Cases"
+    )
+    return fig
+
+
+@app.callback(
+    Output("covid-poly-fit-cv-heatmap", "figure"),
+    Input("covid-data-region-selector", "value"),
+    Input("poly-basis-selector", "value"),
+    prevent_initial_call=True
+)
+@decorators.timed_callback
+@decorators.memoized(
+    key_on_triggered=False, depends_on=[covid_data.COVID_DATA_SNAPSHOT, poly_fits.POLY_FIT_ARTIFACT]
+)
+@decorators.coalesced_callback()
+def covid_data_poly_fit_cv(region: str, basis: str):
+    return prerender.FIGURES.figure("covid-poly-fit-cv-heatmap", region, basis or "monomial")
+
+
+def covid_poly_fit_cv_figure(region: str, basis: str = "monomial"):
+    alphas = poly_fits.POLY_FIT_ALPHAS
+    kinds = poly_fits.POLY_FIT_KINDS
+    degrees = list(range(1, poly_fits.POLY_FIT_MAX_DEGREE + 1))
+
+    with callback_metrics.CALLBACK_METRICS.phase("compute"):
+        errors = regression_utils.cross_validation_grid(
+            covid_data.COVID_DATA.days,
+            covid_data.COVID_DATA.region(region),
+            degrees,
+            alphas,
+            kinds=kinds,
+            basis=basis,
+            n_folds=poly_fits.POLY_FIT_CV_FOLDS,
+            max_iter=poly_fits.POLY_FIT_MAX_ITER,
+            executor=fit_executor.FIT_EXECUTOR
+        )
+
+    fig = make_subplots(rows=1, cols=len(kinds), shared_yaxes=True, subplot_titles=[k.capitalize() for k in kinds])
+    # errors span orders of magnitude once high degrees overfit, so the colors follow log10 of the error
+    with np.errstate(divide="ignore"):
+        log_errors = np.log10(errors)
+    for k, kind in enumerate(kinds):
+        fig.add_trace(
+            go.Heatmap(
+                z=log_errors[k],
+                x=[f"{a:g}" for a in alphas],
+                y=degrees,
+                customdata=errors[k],
+                # one color scale across both models
+                coloraxis="coloraxis",
+                hovertemplate="degree %{y}, alpha %{x}<br>validation RMSE %{customdata:.1f}<extra></extra>"
+            ),
+            row=1,
+            col=k + 1
+        )
+
+        # cells whose fits timed out are nan and stay blank
+        if np.isnan(errors[k]).all():
+            continue
+        best_degree, best_alpha = np.unravel_index(np.nanargmin(errors[k]), errors[k].shape)
+        fig.add_trace(
+            go.Scatter(
+                x=[f"{alphas[best_alpha]:g}"],
+                y=[degrees[best_degree]],
+                mode="markers",
+                marker={"symbol": "star", "size": 14, "color": "#F57F53"},
+                hoverinfo="skip"
+            ),
+            row=1,
+            col=k + 1
+        )
+
+    fig.update_xaxes(title_text="alpha", type="category")
+    fig.update_yaxes(title_text="degree", row=1, col=1)
+    fig.update_layout(
+        title_text=f"{poly_fits.POLY_FIT_CV_FOLDS}-fold validation error in {region}, {basis} basis",
+        coloraxis={"colorscale": "PuRd", "colorbar": {"title": "log10 RMSE"}},
         showlegend=False
     )
+    return fig
+
 
-    return fig
\ No newline at end of file
+# figures for the default inputs are rendered once and embedded in the layout
+prerender.FIGURES.register("p-vs-norm-plot", p_vs_norm_figure, default_args=(None, [2, 10]))
+prerender.FIGURES.register("p-isolines-plot", p_isoline_figure, default_args=(None, "parametric", None))
+prerender.FIGURES.register("covid-data-scatter", covid_data_scatter_figure, default_args=(covid_data.DEFAULT_REGION,))
+prerender.FIGURES.register(
+    "covid-poly-fit-plot",
+    covid_poly_fit_figure,
+    default_args=(covid_data.DEFAULT_REGION, None, "lasso", "monomial")
+)
+prerender.FIGURES.register(
+    "covid-region-compare-plot",
+    covid_region_compare_figure,
+    default_args=(sorted(covid_data.DEFAULT_COMPARE_REGIONS), 2, "lasso", "monomial", 0.0)
+)
+prerender.FIGURES.register(
+    "covid-poly-fit-cv-heatmap", covid_poly_fit_cv_figure, default_args=(covid_data.DEFAULT_REGION, "monomial")
+)
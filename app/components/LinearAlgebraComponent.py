@@ -4,8 +4,9 @@ import dash_core_components as dcc
 import dash_html_components as html
 
 from components.BaseComponent import BaseComponent
-from assets.data.covid_data import COVID_DATA_DF
+from assets.data import covid_data, poly_fits
 from app_factory import app
+from utils import decorators, prerender, upload_utils
 
 linear_algebra_intro_text = """One topic that I come up against almost daily is Linear Algebra. When I took my first 
 linear algebra course I thought it was easy. Very soon after that I realized there was much more to linear algebra than 
@@ -47,6 +48,14 @@ as a demonstration you probably would do something very different if you were tr
 The plot below will let you try out different degrees of the polynomial transformations as well as chose between the two 
 regularization methods"""
 
+cross_validation_text = """The fits above only show how well each model matches the points it was trained on. To see 
+where overfitting starts, the heatmap below holds out part of the days in turn (k-fold cross-validation) and shows the 
+error on the held out days for every degree and alpha. The star marks the best combination for each model."""
+
+region_comparison_text = """Since the polynomial features only depend on the day, every region is fitted in one go. 
+That makes it cheap to put several regions side by side, pick the regions and the alpha below to compare them using 
+the degree, basis and regression method chosen above."""
+
 
 class LinearAlgebraComponent(BaseComponent):
     title: str = "Linear Algebra"
@@ -153,6 +162,29 @@ class LinearAlgebraComponent(BaseComponent):
             **kwargs
         )
 
+    @decorators.wrap_component_with_breaks(0, 1)
+    def vector_upload(
+            self,
+            id: str,
+            status_id: str,
+            *args,
+            **kwargs
+    ):
+        extensions = ", ".join(upload_utils.UPLOAD_EXTENSIONS)
+        return html.Div([
+            dcc.Upload(
+                id=id,
+                children=html.Div(["Or drop a large vector here, or ", html.A("select a file"), f" ({extensions})"]),
+                accept=",".join(upload_utils.UPLOAD_EXTENSIONS),
+                max_size=upload_utils.UPLOAD_MAX_BYTES,
+                multiple=False,
+                className="fancy-text",
+                *args,
+                **kwargs
+            ),
+            html.Small(id=status_id)
+        ])
+
     def isoline_plot_p_form_group(
             self,
             id: str,
@@ -173,6 +205,26 @@ class LinearAlgebraComponent(BaseComponent):
             **kwargs
         )
 
+    def isoline_mode_selector(
+            self,
+            id: str,
+            classes_to_attach: List[str] = None,
+            *args,
+            **kwargs
+    ):
+        labels = ["Parametric iso-lines", "Evaluated grid"]
+        values = ["parametric", "grid"]
+
+        options = [{"label": r[0], "value": r[-1]} for r in zip(labels, values)]
+        return self.dropdown_select(
+            id,
+            value="parametric",
+            options=options,
+            classes_to_attach=classes_to_attach,
+            *args,
+            **kwargs
+        )
+
     def covid_data_region_select(
             self,
             id: str,
@@ -180,11 +232,39 @@ class LinearAlgebraComponent(BaseComponent):
             *args,
             **kwargs
     ):
-        regions = COVID_DATA_DF.columns.to_list()
-        regions = [r for r in regions if r.lower() not in ['days', 'date']]
+        regions = covid_data.COVID_DATA.regions
         options = [{"label": r, "value": r} for r in regions]
         return self.dropdown_select(
-            id, options=options, value="Ile-de-France", classes_to_attach=classes_to_attach, *args, **kwargs
+            id, options=options, value=covid_data.DEFAULT_REGION, classes_to_attach=classes_to_attach, *args, **kwargs
+        )
+
+    @decorators.wrap_component_with_breaks(0, 1)
+    def covid_data_region_multi_select(
+            self,
+            id: str,
+            value: List[str] = None,
+            *args,
+            **kwargs
+    ):
+        regions = covid_data.COVID_DATA.regions
+        options = [{"label": r, "value": r} for r in regions]
+        return dcc.Dropdown(id=id, options=options, value=value, multi=True, *args, **kwargs)
+
+    def compare_alpha_selector(
+            self,
+            id: str,
+            classes_to_attach: List[str] = None,
+            *args,
+            **kwargs
+    ):
+        options = [{"label": f"alpha = {a:g}", "value": f"{a:g}"} for a in poly_fits.POLY_FIT_ALPHAS]
+        return self.dropdown_select(
+            id,
+            value=options[0]["value"],
+            options=options,
+            classes_to_attach=classes_to_attach,
+            *args,
+            **kwargs
         )
 
     def get_regression_type_selector(
@@ -228,6 +308,26 @@ class LinearAlgebraComponent(BaseComponent):
             **kwargs
         )
 
+    def get_polynomial_basis_selector(
+            self,
+            id: str,
+            classes_to_attach: List[str] = None,
+            *args,
+            **kwargs
+    ):
+        labels = ["Monomial basis", "Legendre basis", "Chebyshev basis"]
+        values = ["monomial", "legendre", "chebyshev"]
+
+        options = [{"label": r[0], "value": r[-1]} for r in zip(labels, values)]
+        return self.dropdown_select(
+            id,
+            value="monomial",
+            options=options,
+            classes_to_attach=classes_to_attach,
+            *args,
+            **kwargs
+        )
+
     def layout(
             self,
             make_dash_component: bool = False,
@@ -240,22 +340,44 @@ class LinearAlgebraComponent(BaseComponent):
             *self.text_block(norm_intro_text),
             *self.image(app.get_asset_url("images/lp_norm_equation.png")),
             *self.vector_input_form_group("p-vs-norm-vector-input"),
+            *self.vector_upload("p-vs-norm-upload", "p-vs-norm-upload-status"),
+            dcc.Store(id="p-vs-norm-upload-key"),
+            dcc.Store(id="p-vs-norm-source", data="typed"),
             self.p_value_range_slider("p-vs-norm-range-slider"),
-            *self.figure("p-vs-norm-plot"),
+            *self.figure("p-vs-norm-plot", figure=prerender.FIGURES.default_figure("p-vs-norm-plot")),
             *self.text_block(norm_observation_text),
             *self.sub_section_header("Norm Iso-contours"),
             *self.text_block(norm_isocontours_intro),
             *self.isoline_plot_p_form_group('p-isoline-input'),
-            *self.figure("p-isolines-plot"),
+            *self.isoline_mode_selector("isoline-mode-selector"),
+            *self.figure("p-isolines-plot", figure=prerender.FIGURES.default_figure("p-isolines-plot")),
             *self.text_block(isocontours_text),
             *self.sub_section_header("Application in Regularization"),
             *self.text_block(regularization_intro_text),
             *self.text_block(regularization_post_covid_scatter_text),
-            *self.figure("covid-data-scatter"),
+            *self.figure("covid-data-scatter", figure=prerender.FIGURES.default_figure("covid-data-scatter")),
             *self.covid_data_region_select("covid-data-region-selector"),
             *self.get_regression_type_selector("kind-value-selector"),
             *self.get_polynomial_degree_input("poly-degree-input"),
-            *self.figure("covid-poly-fit-plot")
+            *self.get_polynomial_basis_selector("poly-basis-selector"),
+            *self.figure("covid-poly-fit-plot", figure=prerender.FIGURES.default_figure("covid-poly-fit-plot")),
+            *self.text_block(cross_validation_text),
+            *self.figure(
+                "covid-poly-fit-cv-heatmap", figure=prerender.FIGURES.default_figure("covid-poly-fit-cv-heatmap")
+            ),
+            *self.text_block(region_comparison_text),
+            *self.covid_data_region_multi_select(
+                "covid-compare-region-selector", value=covid_data.DEFAULT_COMPARE_REGIONS
+            ),
+            *self.compare_alpha_selector("compare-alpha-selector"),
+            *self.figure(
+                "covid-region-compare-plot", figure=prerender.FIGURES.default_figure("covid-region-compare-plot")
+            ),
+            # raw cases for every region, sent once with the page so callbacks only return model outputs
+            dcc.Store(id="covid-data-store", data=covid_data.COVID_DATA.client_columns()),
+            dcc.Store(id="poly-fit-predictions"),
+            dcc.Store(id="poly-fit-job"),
+            dcc.Interval(id="poly-fit-job-poller", interval=500, disabled=True)
         ]
 
         if make_dash_component:
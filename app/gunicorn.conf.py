@@ -0,0 +1,24 @@
+import gc
+import os
+
+from utils import concurrency
+
+# STARTUP_MODE=preload imports the app, data and warm caches once in the master and forks the workers from it,
+# so they share those pages copy-on-write instead of each importing everything again
+preload_app = os.environ.get("STARTUP_MODE", "default") == "preload"
+
+workers = concurrency.WORKERS
+threads = concurrency.THREADS
+worker_class = "gthread" if threads > 1 else "sync"
+
+
+def pre_fork(server, worker):
+    # move everything loaded so far out of the collector's reach, otherwise the first gc pass in a worker
+    # touches every object header and copies the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # thread pools are per process, make sure every worker runs with the limits for this server size
+    concurrency.configure_thread_pools()
+
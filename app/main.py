@@ -1,19 +1,33 @@
+import json
 import logging
 import os
 
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
+import flask
+import plotly
 
 from app_factory import app, server
 from components import PageNotFoundComponent, NavBarComponent
 from components import url_component_map
 from callbacks import linear_algebra_callbacks
+from utils import concurrency, decorators, fit_executor, job_queue, prerender, response_cache
+from assets.data import covid_data, poly_fits
 
 
 logger = logging.getLogger("eigenvo-main.py")
 logger.setLevel(logging.INFO)
 
+ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
+# layouts only change with the code, the debug server turns the cache off unless LAYOUT_CACHE is set explicitly
+LAYOUT_CACHE_ENABLED = os.environ.get("LAYOUT_CACHE", "1") == "1"
+# page -> serialized router response, sent as it is instead of encoding the whole tree again on every navigation
+LAYOUT_CACHE = {}
+PAGE_NOT_FOUND_KEY = "404"
+ROUTER_OUTPUT = "page-content.children"
+ROUTER_MAX_BODY = 4096
+
 
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
@@ -25,8 +39,20 @@ app.layout = html.Div([
     dash.dependencies.Output('page-content', 'children'),
     [dash.dependencies.Input('url', 'pathname')]
 )
+@decorators.timed_callback
 def router(pathname):
-    pathname = pathname.replace("/", "")
+    # only reached with the layout cache off, serve_cached_layout answers these requests otherwise
+    return build_page_layout(pathname)
+
+
+def page_key(pathname: str) -> str:
+    # every unknown path renders the same 404 page, so they share one entry
+    pathname = (pathname or "").replace("/", "")
+    return pathname if pathname in url_component_map else PAGE_NOT_FOUND_KEY
+
+
+def build_page_layout(pathname: str) -> html.Div:
+    pathname = (pathname or "").replace("/", "")
     navbar = NavBarComponent.NavBarComponent().layout(pathname)
     component = url_component_map.get(pathname, None)
     if component is None:
@@ -34,19 +60,76 @@ def router(pathname):
     else:
         component = component['component']
 
-    layout = html.Div([navbar, component.layout(make_dash_component=True)])
-    return layout
+    return html.Div([navbar, component.layout(make_dash_component=True)])
+
+
+def cached_router_response(pathname: str) -> bytes:
+    key = page_key(pathname)
+    data = LAYOUT_CACHE.get(key)
+    if data is None:
+        timeouts = fit_executor.thread_timeouts()
+        response = {"multi": True, "response": {"page-content": {"children": build_page_layout(pathname)}}}
+        data = json.dumps(response, cls=plotly.utils.PlotlyJSONEncoder, separators=(",", ":")).encode("utf-8")
+        # a page holding figures whose fits timed out is sent this once and built again next time
+        if fit_executor.thread_timeouts() == timeouts:
+            LAYOUT_CACHE[key] = data
+    return data
+
+
+def invalidate_layout_cache(pathname: str = None):
+    if pathname is None:
+        LAYOUT_CACHE.clear()
+    else:
+        LAYOUT_CACHE.pop(page_key(pathname), None)
+
+
+@server.before_request
+def serve_cached_layout():
+    if not LAYOUT_CACHE_ENABLED or flask.request.method != "POST" or flask.request.path != response_cache.CALLBACK_PATH:
+        return None
+
+    # router requests are tiny, anything larger (an upload for one) is never parsed here
+    if (flask.request.content_length or 0) > ROUTER_MAX_BODY:
+        return None
+    payload = flask.request.get_json(silent=True) or {}
+    if payload.get("output") != ROUTER_OUTPUT:
+        return None
+
+    pathname = next((i.get("value") for i in payload.get("inputs", []) if i.get("id") == "url"), None)
+    return flask.Response(cached_router_response(pathname), mimetype="application/json")
+
+
+def warm_up():
+    # every native library is loaded by now, so the reported limits are the effective ones
+    concurrency.configure_thread_pools()
+
+    # load the data and fit artifact and build every page once, ideally before workers are forked
+    prerender.FIGURES.prerender()
+    poly_fits.POLY_FITS.lookup(covid_data.DEFAULT_REGION, 2, "lasso", poly_fits.POLY_FIT_ALPHAS)
+    if LAYOUT_CACHE_ENABLED:
+        for pathname in [*url_component_map, PAGE_NOT_FOUND_KEY]:
+            cached_router_response(pathname)
+
+
+warm_up()
 
 
 if __name__ == '__main__':
     debug = True
-    ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
     PORT = os.environ.get("PORT", "8050")
     HOST = os.environ.get("HOST", "0.0.0.0")
 
     if ENVIRONMENT == "production":
         debug = False
 
+    # hot reload swaps assets and component code without always restarting, so pages are rebuilt on every visit
+    if debug and "LAYOUT_CACHE" not in os.environ:
+        LAYOUT_CACHE_ENABLED = False
+        invalidate_layout_cache()
+
     logger.info(f"Running in {ENVIRONMENT}")
     logger.info(f"Running on host {HOST} @ port {PORT}, ")
+    # with the reloader on, only the process that actually serves requests runs the job supervisor
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start_supervisor()
     app.run_server(host=HOST, debug=debug, port=PORT)
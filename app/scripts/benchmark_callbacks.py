@@ -0,0 +1,372 @@
+import argparse
+import base64
+import gzip
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import *
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# every fit should run inside the request being measured, not in a background job
+os.environ["JOB_WORKERS"] = "0"
+# memoized results stay in this process, a shared memo directory would leak hits into the next run
+os.environ["MEMO_DISK"] = "0"
+os.environ["UPLOAD_DISK"] = "0"
+
+import brotli  # noqa: E402
+import numpy as np  # noqa: E402
+import plotly  # noqa: E402
+
+import main  # noqa: E402
+from assets.data import covid_data, poly_fits  # noqa: E402
+from callbacks import linear_algebra_callbacks as callbacks  # noqa: E402
+from utils import fit_executor, math_utils, memoization, payload_utils, prerender, regression_utils  # noqa: E402
+from utils import response_cache, upload_utils  # noqa: E402
+
+LONG_VECTOR = ",".join(str(i % 97 - 48) for i in range(1_000))
+VERY_LONG_VECTOR = ",".join(str(i % 997 - 498) for i in range(100_000))
+P_VS_NORM_OUTPUT = "..p-vs-norm-plot.figure...p-vs-norm-upload-status.children.."
+
+
+def npy_upload(n_entries: int) -> str:
+    buffer = io.BytesIO()
+    np.save(buffer, np.random.default_rng(0).standard_normal(n_entries))
+    return f"data:application/octet-stream;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+class Case(NamedTuple):
+    name: str
+    direct: Callable[[], Any]
+    output: str
+    inputs: Dict[str, Any]
+    changed: str
+    # runs before every measured call, after the caches were cleared
+    prepare: Optional[Callable[[], Any]] = None
+
+
+def p_vs_norm_cases() -> List[Case]:
+    cases = []
+    vectors = {"short": "1,2,3", "long": LONG_VECTOR, "very-long": VERY_LONG_VECTOR}
+    p_ranges = {"default": [2, 10], "wide": [-5, 20], "high": [1, 2000]}
+    for vector_name, vector in vectors.items():
+        for range_name, p_values in p_ranges.items():
+            cases.append(Case(
+                f"p_vs_norm_plot[{vector_name},{range_name}]",
+                lambda vector=vector, p_values=p_values: callbacks.p_vs_norm_figure(vector, p_values),
+                P_VS_NORM_OUTPUT,
+                {
+                    "p-vs-norm-vector-input.value": vector,
+                    "p-vs-norm-range-slider.value": p_values,
+                    "p-vs-norm-source.data": "typed",
+                },
+                "p-vs-norm-vector-input.value"
+            ))
+
+    for n_entries in [1_000_000, 4_000_000]:
+        contents = npy_upload(n_entries)
+        cases.append(Case(
+            f"p_vs_norm_upload[{n_entries:,}]",
+            lambda contents=contents: upload_utils.UploadStore().put(contents, "vector.npy")[0],
+            "p-vs-norm-upload-key.data",
+            {"p-vs-norm-upload.contents": contents, "p-vs-norm-upload.filename": "vector.npy"},
+            "p-vs-norm-upload.contents"
+        ))
+
+        # slider moves after an upload only send the key
+        key = upload_utils.UploadStore.make_key(contents, "vector.npy")
+        p_values = [-5, 20]
+        cases.append(Case(
+            f"p_vs_norm_plot[upload {n_entries:,}]",
+            lambda key=key, p_values=p_values: callbacks.p_vs_norm_vector_figure(
+                upload_utils.UPLOADS.get(key), list(range(p_values[0], p_values[-1]))
+            ),
+            P_VS_NORM_OUTPUT,
+            {
+                "p-vs-norm-range-slider.value": p_values,
+                "p-vs-norm-source.data": "upload",
+                "p-vs-norm-upload-key.data": {"key": key, "filename": "vector.npy", "size": n_entries, "uploaded": 0},
+            },
+            "p-vs-norm-range-slider.value",
+            lambda contents=contents: upload_utils.UPLOADS.put(contents, "vector.npy")
+        ))
+    return cases
+
+
+def p_isoline_cases() -> List[Case]:
+    cases = []
+    zoom = {"xaxis.range[0]": 0.5, "xaxis.range[1]": 1.5, "yaxis.range[0]": 0.5, "yaxis.range[1]": 1.5}
+    for p in [0.5, 1, 2, 10, 100]:
+        for mode, relayout_data in [("parametric", None), ("grid", None), ("grid", zoom)]:
+            name = f"p_isoline_plot[p={p},{mode}{',zoomed' if relayout_data else ''}]"
+            cases.append(Case(
+                name,
+                lambda p=p, mode=mode, relayout_data=relayout_data: callbacks.p_isoline_figure(p, mode, relayout_data),
+                "p-isolines-plot.figure",
+                {
+                    "p-isoline-input.value": p,
+                    "isoline-mode-selector.value": mode,
+                    "p-isolines-plot.relayoutData": relayout_data,
+                },
+                "p-isoline-input.value"
+            ))
+    return cases
+
+
+def covid_poly_fit_cases() -> List[Case]:
+    cases = []
+    region = covid_data.DEFAULT_REGION
+    output = "..poly-fit-predictions.data...poly-fit-job.data...poly-fit-job-poller.disabled.."
+    for kind in ["lasso", "ridge"]:
+        for degree in range(1, 16):
+            cases.append(Case(
+                f"covid_data_poly_fit[{kind},degree={degree}]",
+                lambda degree=degree, kind=kind: callbacks.poly_fit_predictions(
+                    region, degree, kind, "monomial",
+                    poly_fits.REGION_FITS.region(region, degree, kind, "monomial", executor=fit_executor.FIT_EXECUTOR)
+                ),
+                output,
+                {
+                    "covid-data-region-selector.value": region,
+                    "poly-degree-input.value": degree,
+                    "kind-value-selector.value": kind,
+                    "poly-basis-selector.value": "monomial",
+                    "poly-fit-job-poller.n_intervals": None,
+                    "poly-fit-job.data": None,
+                },
+                "poly-degree-input.value"
+            ))
+    return cases
+
+
+def covid_region_compare_cases() -> List[Case]:
+    cases = []
+    for n_regions in [1, 4, len(covid_data.COVID_DATA.regions)]:
+        regions = covid_data.COVID_DATA.regions[:n_regions]
+        for kind in ["lasso", "ridge"]:
+            cases.append(Case(
+                f"covid_data_region_compare[{kind},regions={n_regions}]",
+                lambda regions=regions, kind=kind: callbacks.covid_region_compare_figure(
+                    regions, 12, kind, "monomial", 100.0
+                ),
+                "covid-region-compare-plot.figure",
+                {
+                    "covid-compare-region-selector.value": regions,
+                    "poly-degree-input.value": 12,
+                    "kind-value-selector.value": kind,
+                    "poly-basis-selector.value": "monomial",
+                    "compare-alpha-selector.value": "100",
+                },
+                "covid-compare-region-selector.value"
+            ))
+    return cases
+
+
+def covid_poly_fit_cv_cases() -> List[Case]:
+    region = covid_data.DEFAULT_REGION
+    return [
+        Case(
+            f"covid_data_poly_fit_cv[{basis}]",
+            lambda basis=basis: callbacks.covid_poly_fit_cv_figure(region, basis),
+            "covid-poly-fit-cv-heatmap.figure",
+            {"covid-data-region-selector.value": region, "poly-basis-selector.value": basis},
+            "poly-basis-selector.value"
+        )
+        for basis in ["monomial", "legendre", "chebyshev"]
+    ]
+
+
+def router_cases() -> List[Case]:
+    return [
+        Case(
+            f"router[/{pathname}]",
+            lambda pathname=pathname: main.build_page_layout(pathname),
+            "page-content.children",
+            {"url.pathname": f"/{pathname}"},
+            "url.pathname"
+        )
+        for pathname in ["", "home", "linear_algebra", "does-not-exist"]
+    ]
+
+
+def split_prop_id(prop_id: str) -> Dict[str, str]:
+    component_id, component_property = prop_id.rsplit(".", 1)
+    return {"id": component_id, "property": component_property}
+
+
+def dash_request_body(case: Case) -> dict:
+    # build the same payload the dash renderer posts, from the app's own callback definitions
+    callback = main.app.callback_map[case.output]
+    outputs = [split_prop_id(o) for o in case.output.strip(".").split("...")]
+    values = lambda dependencies: [
+        {**d, "value": case.inputs.get(f"{d['id']}.{d['property']}")} for d in dependencies
+    ]
+    return {
+        "output": case.output,
+        "outputs": outputs if case.output.startswith("..") else outputs[0],
+        "inputs": values(callback["inputs"]),
+        "state": values(callback.get("state", [])),
+        "changedPropIds": [case.changed],
+    }
+
+
+def serialized_size(result: Any) -> int:
+    return len(json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def measure(run: Callable[[], int], repeats: int, reset: Optional[Callable[[], None]] = None) -> dict:
+    latencies = []
+    size = 0
+    for _ in range(repeats):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        size = run()
+        latencies.append(time.perf_counter() - start)
+
+    # measure memory on a separate run, tracing slows everything down
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "repeats": repeats,
+        "min_s": latencies[0],
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))],
+        "max_s": latencies[-1],
+        "mean_s": statistics.mean(latencies),
+        "peak_memory_bytes": peak,
+        "response_bytes": size,
+    }
+
+
+def payload_sizes(result: Any) -> dict:
+    # what the builder produces, what the slimming stage sends, and what that compresses to on the wire
+    raw = result.to_dict() if hasattr(result, "to_dict") else result
+    slim = payload_utils.slim_figure(raw) if isinstance(raw, dict) and "data" in raw else raw
+    slim_body = json.dumps(slim, cls=plotly.utils.PlotlyJSONEncoder).encode("utf-8")
+    return {
+        "raw_bytes": serialized_size(raw),
+        "slim_bytes": len(slim_body),
+        "gzip_bytes": len(gzip.compress(slim_body, compresslevel=6)),
+        "br_bytes": len(brotli.compress(slim_body, quality=5)),
+    }
+
+
+def all_cases(only: Optional[str]) -> List[Case]:
+    cases = [
+        *p_vs_norm_cases(),
+        *p_isoline_cases(),
+        *covid_poly_fit_cases(),
+        *covid_region_compare_cases(),
+        *covid_poly_fit_cv_cases(),
+        *router_cases(),
+    ]
+    if only is not None:
+        cases = [c for c in cases if only in c.name]
+    return cases
+
+
+def clear_caches():
+    # a cold run starts from nothing but the data snapshot and the fit artifact, cases that need an upload prepare it
+    response_cache.CALLBACK_RESPONSE_CACHE.clear()
+    memoization.MEMO_CACHE.clear()
+    poly_fits.REGION_FITS.clear()
+    prerender.FIGURES.clear()
+    upload_utils.UPLOADS.clear()
+    math_utils.lp_grid_tile.cache_clear()
+    regression_utils._basis_features.cache_clear()
+    main.invalidate_layout_cache()
+
+
+def run_benchmarks(repeats: int, modes: List[str], only: Optional[str], warm_cache: bool) -> Dict[str, dict]:
+    cases = all_cases(only)
+
+    client = main.app.server.test_client()
+    results = {}
+    for case in cases:
+        def reset():
+            if not warm_cache:
+                clear_caches()
+            if case.prepare is not None:
+                case.prepare()
+
+        if "direct" in modes:
+            results[f"direct:{case.name}"] = measure(lambda: serialized_size(case.direct()), repeats, reset)
+
+        if "http" in modes:
+            body = dash_request_body(case)
+
+            def post() -> int:
+                response = client.post("/_dash-update-component", json=body)
+                if response.status_code not in (200, 204):
+                    raise RuntimeError(f"{case.name} returned {response.status_code}")
+                return len(response.data)
+
+            results[f"http:{case.name}"] = measure(post, repeats, reset)
+
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ["p50_s", "peak_memory_bytes", "response_bytes"]:
+            if result[metric] > reference[metric] * (1 + tolerance) and result[metric] - reference[metric] > 1e-3:
+                regressions.append(f"{name}: {metric} {reference[metric]:.4g} -> {result[metric]:.4g}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark every callback and the router.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["direct", "http"], choices=["direct", "http"])
+    parser.add_argument("--only", default=None, help="only run cases whose name contains this string")
+    parser.add_argument("--warm-cache", action="store_true", help="keep every cache between requests")
+    parser.add_argument("--output", default=None, help="write the results to this json file")
+    parser.add_argument("--compare", default=None, help="baseline json file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--payload-report", action="store_true", help="only report payload sizes before and after slimming"
+    )
+    arguments = parser.parse_args()
+
+    if arguments.payload_report:
+        for case in all_cases(arguments.only):
+            sizes = payload_sizes(case.direct())
+            print(
+                f"{case.name:<70} raw {sizes['raw_bytes'] / 1024:9.1f} kB  slim {sizes['slim_bytes'] / 1024:9.1f} kB  "
+                f"gzip {sizes['gzip_bytes'] / 1024:8.1f} kB  br {sizes['br_bytes'] / 1024:8.1f} kB"
+            )
+        sys.exit(0)
+
+    results = run_benchmarks(arguments.repeats, arguments.modes, arguments.only, arguments.warm_cache)
+    for name, result in results.items():
+        print(
+            f"{name:<70} p50 {result['p50_s'] * 1000:9.2f} ms  p95 {result['p95_s'] * 1000:9.2f} ms  "
+            f"peak {result['peak_memory_bytes'] / 1024:9.0f} kB  size {result['response_bytes'] / 1024:9.1f} kB"
+        )
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as f:
+            regressions = compare(results, json.load(f), arguments.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import *
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTER_REQUEST = {
+    "output": "page-content.children",
+    "outputs": {"id": "page-content", "property": "children"},
+    "inputs": [{"id": "url", "property": "pathname", "value": "/linear_algebra"}],
+    "changedPropIds": ["url.pathname"],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_first_byte(url: str, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read(1)
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f"No response from {url} after {timeout}s")
+
+
+def post_json(url: str, payload: dict) -> int:
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return len(response.read())
+
+
+def child_pids(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    # rss counts shared pages in every process, pss splits them between the processes sharing them
+    memory = {}
+    for path, field in [(f"/proc/{pid}/status", "VmRSS"), (f"/proc/{pid}/smaps_rollup", "Pss")]:
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(f"{field}:"):
+                        memory[field.lower()] = int(line.split()[1])
+        except OSError:
+            pass
+    return memory
+
+
+def run_once(mode: str, workers: int, timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode, ENVIRONMENT="production")
+    command = [
+        sys.executable, "-m", "gunicorn", "main:server",
+        "-b", f"127.0.0.1:{port}", "-w", str(workers), "--log-level", "warning"
+    ]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        first_byte = wait_for_first_byte(f"{base_url}/", timeout)
+        page_start = time.perf_counter()
+        page_bytes = post_json(f"{base_url}/_dash-update-component", ROUTER_REQUEST)
+        page_end = time.perf_counter()
+
+        # give the remaining workers time to finish booting before measuring memory
+        deadline = time.perf_counter() + timeout
+        while len(child_pids(process.pid)) < workers and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        time.sleep(1.0)
+
+        return {
+            "mode": mode,
+            "workers": workers,
+            "time_to_first_byte_s": first_byte - start,
+            "first_page_callback_s": page_end - page_start,
+            "first_page_bytes": page_bytes,
+            "master_memory_kb": memory_kb(process.pid),
+            "worker_memory_kb": [memory_kb(pid) for pid in child_pids(process.pid)],
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=timeout)
+
+
+def summarize(runs: List[dict]) -> dict:
+    worker_rss = [m.get("vmrss", 0) for run in runs for m in run["worker_memory_kb"]]
+    worker_pss = [m.get("pss", 0) for run in runs for m in run["worker_memory_kb"]]
+    return {
+        "runs": len(runs),
+        "median_time_to_first_byte_s": statistics.median(r["time_to_first_byte_s"] for r in runs),
+        "median_first_page_callback_s": statistics.median(r["first_page_callback_s"] for r in runs),
+        "median_worker_rss_kb": statistics.median(worker_rss) if worker_rss else None,
+        "median_worker_pss_kb": statistics.median(worker_pss) if worker_pss else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure gunicorn cold starts with and without preloading.")
+    parser.add_argument("--modes", nargs="+", default=["default", "preload"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None)
+    arguments = parser.parse_args()
+
+    results = {}
+    for mode in arguments.modes:
+        runs = [run_once(mode, arguments.workers, arguments.timeout) for _ in range(arguments.runs)]
+        results[mode] = {"summary": summarize(runs), "runs": runs}
+        print(f"{mode}: {json.dumps(results[mode]['summary'])}")
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,254 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import *
+
+from cold_start_benchmark import APP_DIR, free_port, wait_for_first_byte
+
+CALLBACK_PATH = "/_dash-update-component"
+DEFAULT_RECORDING = os.path.join(os.path.dirname(APP_DIR), "requests.jsonl")
+PAGES = ["/", "/home", "/linear_algebra"]
+
+
+def load_recording(path: str) -> List[dict]:
+    # each line is either a dash payload or {"path": ..., "body": ...}, anything else is skipped
+    requests = []
+    if not os.path.exists(path):
+        return requests
+
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            body = record.get("body", record)
+            if record.get("path", CALLBACK_PATH) == CALLBACK_PATH and "output" in body and "inputs" in body:
+                requests.append(body)
+    return requests
+
+
+def post_json(url: str, payload: dict, timeout: float = 60) -> Tuple[int, bytes]:
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def get_json(url: str) -> Any:
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def collect_components(tree: Any, components: Dict[str, dict]):
+    if isinstance(tree, list):
+        for child in tree:
+            collect_components(child, components)
+    elif isinstance(tree, dict) and "props" in tree:
+        props = tree["props"]
+        if isinstance(props.get("id"), str):
+            components[props["id"]] = {"component_type": tree.get("type"), **props}
+        collect_components(props.get("children"), components)
+    elif isinstance(tree, dict):
+        # callback responses nest the layout under {component id: {property: value}}
+        collect_components(list(tree.values()), components)
+
+
+def sample_value(component: dict, prop: str) -> Any:
+    # values take the shape the component itself holds, e.g. a list for multi dropdowns, checklists and range sliders
+    if prop != "value":
+        return component.get(prop)
+
+    current = component.get("value")
+    options = [o["value"] for o in component.get("options") or []]
+    if options:
+        if component.get("multi") or isinstance(current, list):
+            return random.sample(options, random.randint(1, min(4, len(options))))
+        return random.choice(options)
+    if component.get("component_type") == "RangeSlider":
+        return sorted(random.sample(range(component["min"], component["max"] + 1), 2))
+    if component.get("component_type") == "Slider":
+        return random.randint(component["min"], component["max"])
+    if component.get("type") == "number":
+        low, high = component.get("min", 1), component.get("max", 15)
+        if isinstance(component.get("step"), int):
+            return random.randint(low, high)
+        return round(random.uniform(low, high), 2)
+    if component.get("type") == "text":
+        return ",".join(str(random.randint(-50, 50)) for _ in range(random.randint(2, 20)))
+    return current
+
+
+def synthetic_requests(base_url: str, n_requests: int) -> List[dict]:
+    # walk every page the router serves to learn the component ids, props and options
+    components = {}
+    router_body = {
+        "output": "page-content.children",
+        "outputs": {"id": "page-content", "property": "children"},
+        "changedPropIds": ["url.pathname"],
+    }
+    for page in PAGES:
+        _, body = post_json(
+            f"{base_url}{CALLBACK_PATH}",
+            {**router_body, "inputs": [{"id": "url", "property": "pathname", "value": page}]}
+        )
+        collect_components(json.loads(body)["response"], components)
+
+    # clientside callbacks never reach the server, server callbacks list their clientside_function as null
+    callbacks = [
+        c for c in get_json(f"{base_url}/_dash-dependencies")
+        if all(i["id"] in components for i in c["inputs"]) and not c.get("clientside_function")
+    ]
+
+    requests = []
+    # each callback is triggered by its inputs in turn, callbacks that branch on the trigger see every branch
+    triggers = defaultdict(int)
+    for _ in range(n_requests):
+        callback = random.choice(callbacks)
+        trigger = callback["inputs"][triggers[callback["output"]] % len(callback["inputs"])]
+        triggers[callback["output"]] += 1
+        values = lambda dependencies: [
+            {**d, "value": sample_value(components[d["id"]], d["property"])} for d in dependencies
+        ]
+        outputs = [
+            dict(zip(["id", "property"], o.rsplit(".", 1))) for o in callback["output"].strip(".").split("...")
+        ]
+        requests.append({
+            "output": callback["output"],
+            "outputs": outputs if callback["output"].startswith("..") else outputs[0],
+            "inputs": values(callback["inputs"]),
+            "state": values(callback.get("state", [])),
+            "changedPropIds": [f"{trigger['id']}.{trigger['property']}"],
+        })
+
+    # page navigations go through the router as well
+    requests.extend(
+        {**router_body, "inputs": [{"id": "url", "property": "pathname", "value": random.choice(PAGES)}]}
+        for _ in range(max(1, n_requests // 10))
+    )
+    random.shuffle(requests)
+    return requests
+
+
+def replay(
+        base_url: str,
+        requests: List[dict],
+        concurrency: int,
+        rate: Optional[float]
+) -> Dict[str, dict]:
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def send(i: int, body: dict):
+        # open loop: request i is due at start + i / rate, however long earlier requests take
+        if rate is not None:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent = time.perf_counter()
+        try:
+            status, content = post_json(f"{base_url}{CALLBACK_PATH}", body)
+        except OSError:
+            status, content = 0, b""
+        with lock:
+            samples[body["output"]].append((time.perf_counter() - sent, status, len(content)))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda item: send(*item), enumerate(requests)))
+
+    elapsed = time.perf_counter() - start
+    return {callback_id: summarize(callback_samples, elapsed) for callback_id, callback_samples in samples.items()}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def summarize(samples: List[Tuple[float, int, int]], elapsed: float) -> dict:
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if s[1] not in (200, 204))
+    return {
+        "requests": len(samples),
+        "p50_s": statistics.median(latencies),
+        "p95_s": percentile(latencies, 0.95),
+        "p99_s": percentile(latencies, 0.99),
+        "throughput_rps": len(samples) / elapsed,
+        "error_rate": errors / len(samples),
+        "bytes": sum(s[2] for s in samples),
+    }
+
+
+def start_server(workers: int, timeout: float) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [
+        sys.executable, "-m", "gunicorn", "main:server",
+        "-b", f"127.0.0.1:{port}", "-w", str(workers), "--log-level", "warning"
+    ]
+    # the app sizes its pools and single flight from WEB_CONCURRENCY, not from -w
+    process = subprocess.Popen(
+        command, cwd=APP_DIR, env=dict(os.environ, ENVIRONMENT="production", WEB_CONCURRENCY=str(workers))
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_for_first_byte(f"{base_url}/", timeout)
+    return process, base_url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded dash callback requests against gunicorn.")
+    parser.add_argument("--recording", default=DEFAULT_RECORDING)
+    parser.add_argument("--url", default=None, help="target a running server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers when starting a server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="requests per second, unlimited if omitted")
+    parser.add_argument("--requests", type=int, default=200, help="synthetic requests when nothing is recorded")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None)
+    arguments = parser.parse_args()
+
+    random.seed(arguments.seed)
+    process = None
+    base_url = arguments.url
+    if base_url is None:
+        process, base_url = start_server(arguments.workers, arguments.timeout)
+
+    try:
+        requests = load_recording(arguments.recording)
+        if not requests:
+            print(f"No recorded callback requests in {arguments.recording}, generating synthetic traffic")
+            requests = synthetic_requests(base_url, arguments.requests)
+
+        results = replay(base_url, requests, arguments.concurrency, arguments.rate)
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=arguments.timeout)
+
+    for callback_id, result in sorted(results.items()):
+        print(
+            f"{callback_id:<90} n {result['requests']:5d}  p50 {result['p50_s'] * 1000:8.1f} ms  "
+            f"p95 {result['p95_s'] * 1000:8.1f} ms  p99 {result['p99_s'] * 1000:8.1f} ms  "
+            f"{result['throughput_rps']:7.1f} rps  errors {result['error_rate']:6.1%}  {result['bytes'] / 1024:9.0f} kB"
+        )
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
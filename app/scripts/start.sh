@@ -1,4 +1,15 @@
 #!/bin/bash
 
 [[ -z "$PORT" ]] && export PORT=8050
-gunicorn main:server -b "$HOST:$PORT"
\ No newline at end of file
+# gunicorn.conf.py and the BLAS thread limits are both sized from these
+[[ -z "$WEB_CONCURRENCY" ]] && export WEB_CONCURRENCY=1
+[[ -z "$GUNICORN_THREADS" ]] && export GUNICORN_THREADS=1
+# background processes for slow fits, 0 runs every fit inside the request
+[[ -z "$JOB_WORKERS" ]] && export JOB_WORKERS=1
+# the job workers run under their own supervisor rather than as children of the gunicorn master,
+# it is started from this shell so it exits once gunicorn (which replaces the shell below) is gone
+if [[ "$JOB_WORKERS" -gt 0 ]]; then
+  python -m utils.job_queue --workers "$JOB_WORKERS" &
+fi
+# gunicorn picks up gunicorn.conf.py from this directory, STARTUP_MODE=preload forks workers from a warm master
+exec gunicorn main:server -b "$HOST:$PORT"
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tests import the app the way main.py does (from utils import ...), wherever pytest is started from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
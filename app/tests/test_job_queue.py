@@ -0,0 +1,36 @@
+import time
+
+from utils import job_queue
+
+
+def age_job(store: job_queue.JobStore, job_id: str, created_ago: float, updated_ago: float):
+    now = time.time()
+    with store.transaction() as connection:
+        connection.execute(
+            "UPDATE jobs SET created = ?, updated = ? WHERE id = ?", (now - created_ago, now - updated_ago, job_id)
+        )
+
+
+def test_long_running_jobs_that_report_progress_do_not_expire(tmp_path):
+    store = job_queue.JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.submit("task", {"n": 1}, n_parts=2)
+    assert store.claim()[0] == job_id
+    store.add_part(job_id, 0, [1, 2])
+
+    # started long ago, but the last part came in just now
+    age_job(store, job_id, created_ago=10 * job_queue.JOB_TIMEOUT, updated_ago=1)
+    assert store.result(job_id) == ("running", {0: [1, 2]})
+    assert store.submit("task", {"n": 1}, n_parts=2) == job_id
+    assert store.result(job_id)[1] == {0: [1, 2]}
+
+
+def test_stalled_jobs_expire_and_are_queued_again(tmp_path):
+    store = job_queue.JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.submit("task", {"n": 1}, n_parts=2)
+    store.claim()
+    store.add_part(job_id, 0, [1, 2])
+
+    age_job(store, job_id, created_ago=2 * job_queue.JOB_TIMEOUT, updated_ago=2 * job_queue.JOB_TIMEOUT)
+    assert store.result(job_id)[0] == "expired"
+    store.submit("task", {"n": 1}, n_parts=2)
+    assert store.result(job_id) == ("pending", {})
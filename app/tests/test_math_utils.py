@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from utils import math_utils
+
+P_VALUES = [-np.inf, -3.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0, 3.5, 10.0, np.inf]
+
+
+def reference_norms(vector: np.ndarray, p_values) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        return np.array([np.linalg.norm(vector, ord=p) for p in p_values])
+
+
+@pytest.mark.parametrize("chunk_elements", [math_utils.NORM_CHUNK_ELEMENTS, 7 * len(P_VALUES)])
+def test_lp_norms_match_numpy(chunk_elements):
+    # small chunks make later chunks raise the running max and lower the running min
+    vector = np.random.default_rng(0).standard_normal(1000) * np.linspace(0.01, 50, 1000)
+    norms = math_utils.lp_norms(vector, P_VALUES, chunk_elements=chunk_elements)
+    np.testing.assert_allclose(norms, reference_norms(vector, P_VALUES), rtol=1e-10)
+
+
+def test_lp_norms_with_zeros():
+    vector = np.array([0.0, 3.0, -4.0, 0.0])
+    norms = math_utils.lp_norms(vector, P_VALUES)
+    np.testing.assert_allclose(norms, reference_norms(vector, P_VALUES), rtol=1e-12)
+
+
+def test_lp_norms_do_not_overflow():
+    # numpy overflows here, the scaled sums stay finite
+    vector = np.array([1e300, 1e300, 1e-300])
+    norms = math_utils.lp_norms(vector, [2.0, 10.0, -2.0])
+    np.testing.assert_allclose(norms, [np.sqrt(2) * 1e300, 2 ** 0.1 * 1e300, 1e-300], rtol=1e-12)
+
+
+@pytest.mark.parametrize("p", [-1.0, 0.5, 2.0, 4.0])
+@pytest.mark.parametrize("x_range, y_range", [
+    ((-5, 5), (-5, 5)),
+    # windows that straddle tile edges at a deeper zoom level
+    ((0.3, 1.7), (-1.2, 0.4)),
+    ((-0.013, 0.004), (2.501, 2.52)),
+])
+def test_lp_grid_window_matches_a_direct_grid(p, x_range, y_range):
+    math_utils.lp_grid_tile.cache_clear()
+    x, y, z = math_utils.lp_grid_window(p, x_range, y_range, tile_points=64)
+
+    # the tiles join without gaps or repeated samples and cover the whole window
+    for axis, (low, high) in [(x, x_range), (y, y_range)]:
+        steps = np.diff(axis)
+        np.testing.assert_allclose(steps, steps[0], rtol=1e-6)
+        assert axis[0] <= low and axis[-1] >= high
+        assert 32 <= len(axis) <= 2 * 64 + 2
+
+    with np.errstate(divide="ignore"):
+        expected = np.power(np.abs(x)[None, :], p) + np.power(np.abs(y)[:, None], p)
+    assert z.shape == (len(y), len(x))
+    np.testing.assert_allclose(z, expected, rtol=1e-5)
+
+
+def test_lp_grid_window_reuses_tiles_while_panning():
+    math_utils.lp_grid_tile.cache_clear()
+    math_utils.lp_grid_window(2.0, (0.1, 0.9), (0.1, 0.9), tile_points=64)
+    misses = math_utils.lp_grid_tile.cache_info().misses
+
+    # a small pan inside the same tiles computes nothing new
+    math_utils.lp_grid_window(2.0, (0.15, 0.95), (0.05, 0.85), tile_points=64)
+    assert math_utils.lp_grid_tile.cache_info().misses == misses
@@ -0,0 +1,121 @@
+import os
+import time
+
+import pytest
+
+from utils import fit_executor, memoization
+
+
+def disk_tier(tmp_path, **kwargs) -> memoization.DiskTier:
+    return memoization.DiskTier(str(tmp_path / "memo"), **kwargs)
+
+
+def test_memory_tier_evicts_the_least_recently_read():
+    memory = memoization.MemoryTier(max_bytes=250)
+    memory.put("a", "A", 100)
+    memory.put("b", "B", 100)
+    assert memory.get("a") == "A"
+
+    assert memory.put("c", "C", 100) == 1
+    assert memory.get("b") is memoization.MISSING
+    assert memory.get("a") == "A" and memory.get("c") == "C"
+    # larger than the whole tier, never stored
+    assert memory.put("d", "D", 1000) == 0 and "d" not in memory
+
+
+def test_disk_tier_drops_expired_entries(tmp_path):
+    disk = disk_tier(tmp_path, ttl=60)
+    disk.put("fresh", b"1")
+    disk.put("stale", b"2")
+    # written two minutes ago
+    past = time.time() - 120
+    os.utime(disk._path("stale"), (past, past))
+
+    assert disk.get("fresh") == (b"1", False)
+    assert disk.get("stale") == (None, True)
+    assert not os.path.exists(disk._path("stale"))
+
+
+def test_disk_tier_evicts_by_access_time(tmp_path):
+    disk = disk_tier(tmp_path, max_bytes=250)
+    disk.put("a", b"a" * 100)
+    disk.put("b", b"b" * 100)
+    now = time.time()
+    os.utime(disk._path("a"), (now - 200, now))
+    os.utime(disk._path("b"), (now - 100, now))
+    # reading a makes b the least recently used entry, whatever order they were written in
+    assert disk.get("a")[0] == b"a" * 100
+
+    assert disk.put("c", b"c" * 100) == 1
+    assert os.path.exists(disk._path("a")) and os.path.exists(disk._path("c"))
+    assert not os.path.exists(disk._path("b"))
+
+
+def test_disk_tier_tightens_an_open_directory(tmp_path):
+    directory = tmp_path / "memo"
+    directory.mkdir(mode=0o777)
+    os.chmod(directory, 0o777)
+
+    disk = disk_tier(tmp_path)
+    assert disk.usable()
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+
+def test_disk_tier_refuses_a_symlinked_directory(tmp_path):
+    (tmp_path / "elsewhere").mkdir(mode=0o700)
+    os.symlink(tmp_path / "elsewhere", tmp_path / "memo")
+
+    disk = disk_tier(tmp_path)
+    assert not disk.usable()
+    assert disk.put("a", b"1") == 0
+    assert disk.get("a") == (None, False)
+    assert not os.listdir(tmp_path / "elsewhere")
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="changing the owner needs root")
+def test_disk_tier_refuses_a_directory_of_another_user(tmp_path):
+    directory = tmp_path / "memo"
+    directory.mkdir(mode=0o700)
+    os.chown(directory, 65534, 65534)
+
+    disk = disk_tier(tmp_path)
+    assert not disk.usable()
+    assert disk.put("a", b"1") == 0
+    assert not os.listdir(directory)
+
+
+def test_call_stores_complete_results(tmp_path):
+    memo = memoization.Memoizer(memoization.MemoryTier(), disk_tier(tmp_path))
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return {"x": x}
+
+    assert memo.call("f", f, (1,), {}) == {"x": 1}
+    assert memo.call("f", f, (1,), {}) == {"x": 1}
+    assert calls == [1]
+    assert memo.counters()[("f", "memory_hit")] == 1
+
+    # another worker only has the disk tier
+    other = memoization.Memoizer(memoization.MemoryTier(), disk_tier(tmp_path))
+    assert other.call("f", f, (1,), {}) == {"x": 1}
+    assert calls == [1]
+    assert other.counters()[("f", "disk_hit")] == 1
+
+
+def test_call_does_not_store_results_after_a_timeout(tmp_path):
+    memo = memoization.Memoizer(memoization.MemoryTier(), disk_tier(tmp_path))
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        # stands in for a fit that timed out while the result was built
+        fit_executor._mark_partial()
+        return {"x": x, "partial": True}
+
+    assert memo.call("f", f, (1,), {}) == {"x": 1, "partial": True}
+    assert memo.call("f", f, (1,), {}) == {"x": 1, "partial": True}
+    assert calls == [1, 1]
+    assert memo.counters()[("f", "miss")] == 2
+    assert not os.listdir(tmp_path / "memo")
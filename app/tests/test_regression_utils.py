@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import Lasso, Ridge
+from sklearn.model_selection import cross_val_predict
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+from utils import regression_utils
+from utils.fit_executor import FitExecutor
+
+ALPHAS = [0.0, 0.01, 0.1, 1.0, 10.0, 100.0]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((60, 5))
+    y = x @ np.array([3.0, -2.0, 0.0, 0.5, 0.0]) + 4.0 + 0.1 * rng.standard_normal(60)
+    return x, y
+
+
+def test_ridge_path_matches_sklearn(data):
+    x, y = data
+    coefs, intercepts = regression_utils.ridge_path(x, y, ALPHAS)
+
+    for i, alpha in enumerate(ALPHAS):
+        model = Ridge(alpha=alpha).fit(x, y)
+        np.testing.assert_allclose(coefs[i], model.coef_, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(intercepts[i], model.intercept_, rtol=1e-8)
+
+
+@pytest.mark.parametrize("executor", [None, FitExecutor(max_workers=3)])
+def test_warm_lasso_path_matches_cold_sklearn_fits(data, executor):
+    x, y = data
+    lasso_alphas = [a for a in ALPHAS if a > 0]
+    coefs, intercepts = regression_utils.lasso_path(x, y, lasso_alphas, executor=executor)
+
+    # warm starts only change where coordinate descent begins, not the solution it converges to
+    for i, alpha in enumerate(lasso_alphas):
+        model = Lasso(alpha=alpha, tol=1e-10, max_iter=100000).fit(x, y)
+        np.testing.assert_allclose(coefs[i], model.coef_, atol=1e-3)
+        np.testing.assert_allclose(intercepts[i], model.intercept_, atol=1e-3)
+
+
+@pytest.mark.parametrize("degree", [1, 3, 8])
+def test_monomial_features_match_sklearn(degree):
+    x = np.arange(1, 31, dtype=np.float64)
+    features = regression_utils.basis_features(x, degree)
+
+    scaled = StandardScaler().fit_transform(x[:, None])
+    expected = PolynomialFeatures(degree, include_bias=False).fit_transform(scaled)
+    np.testing.assert_allclose(features, expected, rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize("basis", ["legendre", "chebyshev"])
+def test_orthogonal_bases_span_the_monomials(basis):
+    # every basis spans the same polynomials, so unregularized fits predict the same curve
+    x = np.arange(1, 31, dtype=np.float64)
+    y = np.random.default_rng(1).standard_normal(30)
+    degree = 6
+
+    def least_squares(features: np.ndarray) -> np.ndarray:
+        coefs, intercepts = regression_utils.ridge_path(features, y, [0.0])
+        return regression_utils.path_predictions(features, coefs, intercepts)[0]
+
+    monomial = least_squares(regression_utils.basis_features(x, degree))
+    np.testing.assert_allclose(least_squares(regression_utils.basis_features(x, degree, basis)), monomial, atol=1e-8)
+
+
+@pytest.mark.parametrize("executor", [None, FitExecutor(max_workers=3)])
+def test_cross_validation_grid_matches_sklearn(executor):
+    x = np.arange(1, 41, dtype=np.float64)
+    y = 0.05 * (x - 20) ** 2 + np.random.default_rng(2).standard_normal(40)
+    degrees = [1, 2, 4]
+    alphas = [0.01, 1.0, 10.0]
+    kinds = ["lasso", "ridge"]
+    errors = regression_utils.cross_validation_grid(x, y, degrees, alphas, kinds=kinds, n_folds=4, executor=executor)
+
+    folds = regression_utils.kfold_indices(len(y), 4)
+    models = {"lasso": lambda alpha: Lasso(alpha=alpha, max_iter=2000), "ridge": lambda alpha: Ridge(alpha=alpha)}
+    for k, kind in enumerate(kinds):
+        for d, degree in enumerate(degrees):
+            features = regression_utils.basis_features(x, degree)
+            for a, alpha in enumerate(alphas):
+                predictions = cross_val_predict(models[kind](alpha), features, y, cv=folds)
+                expected = np.sqrt(np.mean((predictions - y) ** 2))
+                np.testing.assert_allclose(errors[k, d, a], expected, rtol=1e-3)
+
+
+def test_kfold_indices_partition_the_samples():
+    folds = regression_utils.kfold_indices(23, 5)
+    validation = np.concatenate([val for _, val in folds])
+    np.testing.assert_array_equal(np.sort(validation), np.arange(23))
+    for train, val in folds:
+        assert not np.intersect1d(train, val).size
+        assert len(train) + len(val) == 23
+
+
+@pytest.mark.parametrize("kind", ["lasso", "ridge"])
+@pytest.mark.parametrize("executor", [None, FitExecutor(max_workers=2)])
+def test_batched_fits_match_per_region_fits(kind, executor):
+    rng = np.random.default_rng(3)
+    x = np.arange(1, 26, dtype=np.float64)
+    y = np.cumsum(rng.poisson(5, (25, 4)), axis=0).astype(np.float64)
+    alphas = [0.1, 1.0, 10.0]
+    _, _, predictions = regression_utils.batch_poly_fit_path(x, y, 3, kind, alphas, executor=executor)
+
+    for region in range(y.shape[1]):
+        _, _, expected = regression_utils.poly_fit_path(x, y[:, region], 3, kind, alphas)
+        np.testing.assert_allclose(predictions[:, region], expected, rtol=1e-3, atol=1e-3)
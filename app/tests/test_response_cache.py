@@ -0,0 +1,70 @@
+import json
+
+import flask
+import pytest
+
+from utils import response_cache
+
+
+@pytest.fixture
+def cached_app():
+    cache = response_cache.CallbackResponseCache()
+    server = flask.Flask(__name__)
+    cache.init_app(server)
+    calls = []
+
+    @server.route(response_cache.CALLBACK_PATH, methods=["POST"])
+    def callback():
+        payload = flask.request.get_json()
+        calls.append(payload)
+        if payload.get("side_effect"):
+            response_cache.no_store()
+        return flask.jsonify({"response": payload["inputs"]})
+
+    return server.test_client(), cache, calls
+
+
+def test_repeated_requests_are_served_from_the_cache(cached_app):
+    client, cache, calls = cached_app
+
+    post = lambda data: client.post(response_cache.CALLBACK_PATH, data=data, content_type="application/json")
+    first = post('{"output": "a.children", "inputs": [1]}')
+    # the same payload with its keys in another order addresses the same response
+    second = post('{"inputs": [1], "output": "a.children"}')
+
+    assert first.status_code == second.status_code == 200
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public")
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_matching_etag_gets_not_modified(cached_app):
+    client, cache, calls = cached_app
+    body = {"output": "a.children", "inputs": [1]}
+
+    etag = client.post(response_cache.CALLBACK_PATH, json=body).headers["ETag"]
+    revalidated = client.post(response_cache.CALLBACK_PATH, json=body, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert revalidated.headers["ETag"] == etag
+
+    changed = client.post(response_cache.CALLBACK_PATH, json={**body, "inputs": [2]}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(calls) == 2
+
+
+def test_no_store_responses_are_never_cached(cached_app):
+    client, cache, calls = cached_app
+    body = {"output": "job.data", "inputs": [1], "side_effect": True}
+
+    for _ in range(2):
+        response = client.post(response_cache.CALLBACK_PATH, json=body)
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "no-store"
+        assert "ETag" not in response.headers
+
+    assert len(calls) == 2
+    assert cache.hits == 0
+    assert cache.get(cache.make_key(json.dumps(body).encode("utf-8"))) is None
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import flask
+import pytest
+
+from utils import memoization, response_cache, single_flight
+from utils.fit_executor import FitExecutor
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_followers_do_not_cache_a_partial_result(tmp_path, shared):
+    # with shared, the two requests stand for two workers that only share the flight directory
+    directory = str(tmp_path / "flights")
+    leader_flight = single_flight.SingleFlight(directory=directory, shared=shared)
+    follower_flight = single_flight.SingleFlight(directory=directory, shared=True) if shared else leader_flight
+    flights = {"leader": leader_flight, "follower": follower_flight}
+
+    cache = response_cache.CallbackResponseCache()
+    memo = memoization.Memoizer(memoization.MemoryTier())
+    executor = FitExecutor(max_workers=2, timeout=0.2)
+    computing = threading.Event()
+
+    def slow_fit(_):
+        time.sleep(1.0)
+
+    def compute():
+        computing.set()
+        # times out, so the result is partial
+        executor.map(slow_fit, [0])
+        return {"figure": "partial"}
+
+    server = flask.Flask(__name__)
+    cache.init_app(server)
+
+    @server.route(response_cache.CALLBACK_PATH, methods=["POST"])
+    def callback():
+        flight = flights[flask.request.args["role"]]
+        result = memo.call("compare", lambda: flight.run("compare-key", compute), (), {}, key_on_triggered=False)
+        return flask.jsonify(result)
+
+    responses = {}
+
+    def post(role: str):
+        client = server.test_client()
+        responses[role] = client.post(f"{response_cache.CALLBACK_PATH}?role={role}", json={"inputs": [1]})
+
+    leader = threading.Thread(target=post, args=("leader",))
+    leader.start()
+    assert computing.wait(5)
+    follower = threading.Thread(target=post, args=("follower",))
+    follower.start()
+    leader.join()
+    follower.join()
+
+    for role in ["leader", "follower"]:
+        assert responses[role].get_json() == {"figure": "partial"}
+        assert responses[role].headers["Cache-Control"] == "no-store"
+    assert cache.get(cache.make_key(b'{"inputs": [1]}')) is None
+    assert not memo.memory._entries
+    if shared:
+        assert follower_flight.followers == 1
+    else:
+        assert leader_flight.followers == 1
@@ -0,0 +1,34 @@
+import base64
+import io
+
+import numpy as np
+import pytest
+
+from utils import memoization, upload_utils
+
+
+def npy_contents(vector: np.ndarray) -> str:
+    buffer = io.BytesIO()
+    np.save(buffer, vector)
+    return f"data:application/octet-stream;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def disk_store(directory: str) -> upload_utils.UploadStore:
+    return upload_utils.UploadStore(disk=memoization.DiskTier(directory, suffix=".npy"))
+
+
+def test_uploads_are_shared_through_the_disk_tier(tmp_path):
+    vector = np.arange(1, 101, dtype=np.float64)
+    key, parsed = disk_store(str(tmp_path)).put(npy_contents(vector), "vector.npy")
+    np.testing.assert_array_equal(parsed, vector)
+
+    # another worker only has the key
+    np.testing.assert_array_equal(disk_store(str(tmp_path)).get(key), vector)
+
+
+def test_missing_and_unreadable_uploads(tmp_path):
+    store = disk_store(str(tmp_path))
+    assert store.get("0" * 64) is None
+    with pytest.raises(ValueError):
+        store.put("data:text/csv;base64,YSxi", "vector.csv")
+    assert not list(tmp_path.iterdir())
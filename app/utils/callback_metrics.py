@@ -0,0 +1,146 @@
+import contextlib
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import *
+
+import flask
+
+logger = logging.getLogger("callback-metrics-logger")
+logger.setLevel(logging.INFO)
+
+CALLBACK_PATH = "/_dash-update-component"
+METRICS_PATH = os.environ.get("METRICS_PATH", "/metrics")
+METRICS_ENABLED = os.environ.get("CALLBACK_METRICS", "1") == "1"
+# upper bounds in seconds, in the spirit of the prometheus defaults
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("parse", "compute", "figure", "serialize", "total")
+
+
+class CallbackMetrics:
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        # (callback id, phase) -> [count per bucket..., +Inf count, sum]
+        self._histograms = {}
+        # other modules' render functions, their text is appended to /metrics
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, callback_id: str, phase: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((callback_id, phase))
+            if histogram is None:
+                histogram = self._histograms[(callback_id, phase)] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    @staticmethod
+    def _phases() -> Optional[Dict[str, float]]:
+        if not flask.has_request_context():
+            return None
+        return flask.g.get("callback_phases")
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # outside of a timed request (prerendering, benchmarks) this only runs the block
+        phases = self._phases()
+        if phases is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases[name] += time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def callback(self) -> Iterator[None]:
+        phases = self._phases()
+        if phases is None:
+            yield
+            return
+
+        # everything between the request arriving and the callback starting is dash parsing the request
+        start = time.perf_counter()
+        phases["parse"] += start - flask.g.callback_request_start
+        measured = sum(phases.values())
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            # whatever the callback did outside of an explicit phase went into building the figure
+            phases["figure"] += (end - start) - (sum(phases.values()) - measured)
+            flask.g.callback_end = end
+
+    def render(self) -> str:
+        lines = [
+            "# HELP dash_callback_phase_seconds Time spent per dash callback and phase.",
+            "# TYPE dash_callback_phase_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+
+        for (callback_id, phase), histogram in sorted(histograms.items()):
+            labels = f'callback="{callback_id}",phase="{phase}"'
+            for bound, count in zip(self.buckets, histogram):
+                lines.append(f'dash_callback_phase_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'dash_callback_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}')
+            lines.append(f"dash_callback_phase_seconds_sum{{{labels}}} {histogram[-1]:.6f}")
+            lines.append(f"dash_callback_phase_seconds_count{{{labels}}} {histogram[-2]}")
+        return "\n".join(lines) + "\n"
+
+    def _before_request(self):
+        if flask.request.method != "POST" or flask.request.path != CALLBACK_PATH:
+            return None
+
+        flask.g.callback_request_start = time.perf_counter()
+        flask.g.callback_phases = defaultdict(float)
+        return None
+
+    def _after_request(self, response: flask.Response) -> flask.Response:
+        phases = flask.g.get("callback_phases")
+        if phases is None:
+            return response
+
+        end = time.perf_counter()
+        callback_end = flask.g.get("callback_end")
+        if callback_end is not None:
+            phases["serialize"] += end - callback_end
+        phases["total"] = end - flask.g.callback_request_start
+
+        payload = flask.request.get_json(silent=True) or {}
+        callback_id = payload.get("output", "unknown")
+        for phase, seconds in phases.items():
+            self.observe(callback_id, phase, seconds)
+
+        # cached responses never reach the callback, so they only report a total
+        response.headers["Server-Timing"] = ", ".join(
+            f"{phase};dur={phases[phase] * 1000:.2f}" for phase in PHASES if phase in phases
+        )
+        return response
+
+    def add_collector(self, render: Callable[[], str]):
+        self._collectors.append(render)
+
+    def _metrics_view(self) -> flask.Response:
+        text = "".join([self.render(), *(render() for render in self._collectors)])
+        return flask.Response(text, mimetype="text/plain; version=0.0.4")
+
+    def init_app(self, server: flask.Flask):
+        # each gunicorn worker keeps its own histograms, /metrics reports the worker that answers
+        if not METRICS_ENABLED:
+            return
+
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+        server.add_url_rule(METRICS_PATH, "callback_metrics", self._metrics_view)
+
+
+CALLBACK_METRICS = CallbackMetrics()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import logging
+import os
+from typing import *
+
+from threadpoolctl import threadpool_info, threadpool_limits
+
+logger = logging.getLogger("concurrency-logger")
+logger.setLevel(logging.INFO)
+
+# same variables that scripts/start.sh and gunicorn.conf.py use to size the server
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+THREADS = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # containers (e.g. Cloud Run) usually express their cpu limit as a cgroup quota rather than an affinity mask
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
+
+
+def cpu_share(
+        workers: int = WORKERS,
+        threads: int = THREADS,
+        cpus: int = None
+) -> int:
+    # every request thread of every worker may run a fit at the same time, so each gets this many cores
+    if cpus is None:
+        cpus = available_cpus()
+    return max(1, cpus // max(1, workers * threads))
+
+
+def fit_pool_size(
+        workers: int = WORKERS,
+        threads: int = THREADS,
+        cpus: int = None
+) -> int:
+    # a request fans its fits out over the fit pool, by default one pool thread per core of its share
+    size = os.environ.get("FIT_POOL_SIZE")
+    if size is not None:
+        return int(size)
+    return cpu_share(workers, threads, cpus)
+
+
+def blas_threads_per_worker(
+        workers: int = WORKERS,
+        threads: int = THREADS,
+        cpus: int = None
+) -> int:
+    # the share of a request thread is split again between its fit pool threads, each of which may call into BLAS
+    limit = os.environ.get("BLAS_THREADS")
+    if limit is not None:
+        return int(limit)
+    return max(1, cpu_share(workers, threads, cpus) // max(1, fit_pool_size(workers, threads, cpus)))
+
+
+def configure_thread_pools(
+        workers: int = WORKERS,
+        threads: int = THREADS
+) -> List[dict]:
+    limit = blas_threads_per_worker(workers, threads)
+
+    # covers native libraries that are only loaded later, threadpool_limits covers the ones already loaded
+    for variable in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+        os.environ.setdefault(variable, str(limit))
+    threadpool_limits(limits=limit)
+
+    pools = threadpool_info()
+    logger.info(
+        f"{available_cpus()} cpus, {workers} worker(s) x {threads} thread(s) x {fit_pool_size(workers, threads)} fit "
+        f"thread(s): limiting BLAS/OpenMP pools to {limit} "
+        f"thread(s), effective: {[(p['internal_api'], p['num_threads']) for p in pools]}"
+    )
+    return pools
\ No newline at end of file
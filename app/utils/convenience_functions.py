@@ -1,3 +1,5 @@
+import os
+import stat
 from typing import *
 
 
@@ -5,4 +7,23 @@ def list_to_string(
         input_list: List[str],
         delimiter: str = " "
 ) -> str:
-    return delimiter.join(input_list)
\ No newline at end of file
+    return delimiter.join(input_list)
+
+
+def ensure_private_directory(path: str) -> bool:
+    # pickles are loaded back from these directories, so they have to belong to this user and be closed to others
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+        if not stat.S_ISDIR(info.st_mode):
+            return False
+        if not hasattr(os, "getuid"):
+            return True
+        if info.st_uid != os.getuid():
+            return False
+        # left behind by older versions with the default mode
+        if info.st_mode & 0o077:
+            os.chmod(path, 0o700)
+        return True
+    except OSError:
+        return False
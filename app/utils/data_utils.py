@@ -1,4 +1,5 @@
 import logging
+from typing import *
 
 import numpy as np
 
@@ -34,3 +35,28 @@ def string_to_range(s: str, return_list=True):
         output = None
 
     return output
+
+
+def relayout_to_range(relayout_data: Optional[dict], axis: str, default: Tuple[float, float]):
+    if not relayout_data or relayout_data.get(f"{axis}.autorange"):
+        return default
+
+    try:
+        if f"{axis}.range" in relayout_data:
+            low, high = relayout_data[f"{axis}.range"]
+        else:
+            low, high = relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]
+        low, high = sorted((float(low), float(high)))
+    except (KeyError, TypeError, ValueError):
+        return default
+
+    if high <= low:
+        return default
+
+    return low, high
+
+
+def is_viewport_change(relayout_data: Optional[dict]) -> bool:
+    if not relayout_data:
+        return False
+    return any(key.startswith(("xaxis.", "yaxis.")) for key in relayout_data)
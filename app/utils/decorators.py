@@ -1,6 +1,10 @@
+import functools
+
 from dash_html_components import Br
 from typing import *
 
+from utils import callback_metrics, memoization, single_flight
+
 
 def attach_classes(f):
     def wrapper_function(*args, **kwargs):
@@ -35,3 +39,39 @@ def wrap_component_with_breaks(n_before: int = 1, n_after: int = 1):
             return output
         return w
     return wrapper
+
+
+def timed_callback(f):
+    # goes right under @app.callback, the phases end up in the Server-Timing header and on /metrics
+    @functools.wraps(f)
+    def w(*args, **kwargs):
+        with callback_metrics.CALLBACK_METRICS.callback():
+            return f(*args, **kwargs)
+    return w
+
+
+def memoized(key_on_triggered: bool = True, depends_on: Sequence[str] = ()):
+    # goes between timed_callback and coalesced_callback, results are kept in memory and on disk for every worker.
+    # hits return the stored object, so callbacks must not mutate it. key_on_triggered=False is for callbacks
+    # that never read callback_context, depends_on lists data files whose changes invalidate the results
+    def wrapper(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+
+        @functools.wraps(f)
+        def w(*args, **kwargs):
+            return memoization.MEMO_CACHE.call(name, f, args, kwargs, key_on_triggered, depends_on)
+        return w
+    return wrapper
+
+
+def coalesced_callback(supersede_on: Sequence[str] = ()):
+    # goes under timed_callback and memoized: concurrent calls with the same inputs share one computation, and a request
+    # triggered by one of the supersede_on props is dropped when the same client sends a newer one
+    def wrapper(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+
+        @functools.wraps(f)
+        def w(*args, **kwargs):
+            return single_flight.SINGLE_FLIGHT.call(name, f, args, kwargs, supersede_on)
+        return w
+    return wrapper
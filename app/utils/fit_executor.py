@@ -0,0 +1,88 @@
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import *
+
+from utils import concurrency, response_cache
+
+logger = logging.getLogger("fit-executor-logger")
+logger.setLevel(logging.INFO)
+
+# sized together with the BLAS limit so workers x threads x pool x BLAS threads stays within the cores
+FIT_POOL_SIZE = concurrency.fit_pool_size()
+FIT_TIMEOUT = float(os.environ.get("FIT_TIMEOUT", "10"))
+# per calling thread, so whoever caches a result can tell whether any of its fits timed out while building it
+_local = threading.local()
+
+
+def thread_timeouts() -> int:
+    return getattr(_local, "timeouts", 0)
+
+
+def _mark_partial():
+    _local.timeouts = thread_timeouts() + 1
+    # a partial result must not be served again from the response cache, nginx or the browser
+    response_cache.no_store()
+
+
+class FitExecutor:
+    def __init__(
+            self,
+            max_workers: int = FIT_POOL_SIZE,
+            timeout: float = FIT_TIMEOUT
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[concurrent.futures.ThreadPoolExecutor]:
+        if self.max_workers <= 1:
+            return None
+
+        # threads do not survive a fork, so each gunicorn worker lazily creates its own pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="fit"
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def map(
+            self,
+            fn: Callable,
+            items: Sequence[Any],
+            timeout: float = None
+    ) -> List[Optional[Any]]:
+        executor = self._get_executor()
+        if executor is None:
+            return [fn(item) for item in items]
+
+        try:
+            futures = [executor.submit(fn, item) for item in items]
+        except RuntimeError:
+            # the pool has been shut down, run in the calling thread instead
+            return [fn(item) for item in items]
+
+        # whatever has not finished in time comes back as None. only fits still waiting in the queue are cancelled,
+        # a running fit cannot be interrupted and keeps its pool thread until it ends, its result is then dropped
+        done, not_done = concurrent.futures.wait(futures, timeout=timeout or self.timeout)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            _mark_partial()
+            logger.warning(f"{len(not_done)} of {len(futures)} fits did not finish within {timeout or self.timeout}s")
+
+        return [future.result() if future in done else None for future in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+FIT_EXECUTOR = FitExecutor()
\ No newline at end of file
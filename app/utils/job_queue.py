@@ -0,0 +1,231 @@
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import *
+
+from utils import concurrency
+
+logger = logging.getLogger("job-queue-logger")
+logger.setLevel(logging.INFO)
+
+JOB_DB = os.environ.get("JOB_DB", "/tmp/eigenvo_jobs.sqlite")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "0"))
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", "120"))
+JOB_TTL = float(os.environ.get("JOB_TTL", str(24 * 60 * 60)))
+POLL_INTERVAL = 0.2
+SUPERVISE_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n_parts INTEGER NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_parts (
+    job_id TEXT NOT NULL,
+    part INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, part)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = JOB_DB):
+        self.path = path
+        self._initialized_pid = None
+
+    def connect(self) -> sqlite3.Connection:
+        # a fresh connection per call keeps this safe across threads and forked processes
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if self._initialized_pid != os.getpid():
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._initialized_pid = os.getpid()
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            yield connection
+            connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    @staticmethod
+    def make_id(task: str, params: dict) -> str:
+        # identical requests share one job
+        canonical = json.dumps([task, params], sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def submit(self, task: str, params: dict, n_parts: int) -> str:
+        job_id = self.make_id(task, params)
+        now = time.time()
+        with self.transaction() as connection:
+            row = connection.execute("SELECT status, updated FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            # failed jobs, and jobs nobody picked up or finished in time, are queued again from scratch
+            expired = row is not None and (
+                row[0] == "failed" or (row[0] in ("pending", "running") and now - row[1] > JOB_TIMEOUT)
+            )
+            if row is None or expired:
+                connection.execute("DELETE FROM job_parts WHERE job_id = ?", (job_id,))
+                connection.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                    (job_id, task, json.dumps(params), n_parts, now, now)
+                )
+        return job_id
+
+    def claim(self) -> Optional[Tuple[str, str, dict]]:
+        with self.transaction() as connection:
+            # a running job that stopped reporting belonged to a worker that died, so it is picked up again
+            row = connection.execute(
+                "SELECT id, task, params FROM jobs WHERE status = 'pending' OR (status = 'running' AND updated < ?) "
+                "ORDER BY created LIMIT 1",
+                (time.time() - JOB_TIMEOUT,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (time.time(), row[0])
+                )
+
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def add_part(self, job_id: str, part: int, payload: Any):
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO job_parts VALUES (?, ?, ?)", (job_id, part, json.dumps(payload))
+            )
+            connection.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+
+    def set_status(self, job_id: str, status: str):
+        with self.transaction() as connection:
+            connection.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def result(self, job_id: str) -> Tuple[Optional[str], Dict[int, Any]]:
+        with contextlib.closing(self.connect()) as connection:
+            row = connection.execute("SELECT status, updated FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            parts = connection.execute("SELECT part, payload FROM job_parts WHERE job_id = ?", (job_id,)).fetchall()
+
+        if row is None:
+            return None, {}
+
+        # same rule as submit, a job that keeps adding parts is alive however long it has been running
+        status, updated = row
+        if status in ("pending", "running") and time.time() - updated > JOB_TIMEOUT:
+            status = "expired"
+        return status, {part: json.loads(payload) for part, payload in parts}
+
+    def purge(self, ttl: float = JOB_TTL):
+        cutoff = time.time() - ttl
+        with self.transaction() as connection:
+            connection.execute(
+                "DELETE FROM job_parts WHERE job_id IN (SELECT id FROM jobs WHERE updated < ?)", (cutoff,)
+            )
+            connection.execute("DELETE FROM jobs WHERE updated < ?", (cutoff,))
+
+
+JOB_STORE = JobStore()
+
+
+def resolve_task(task: str) -> Callable[..., Iterator[Tuple[int, Any]]]:
+    # tasks are referenced as "module:function" so worker processes only import what they run
+    module_name, function_name = task.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_worker(store: JobStore = JOB_STORE, poll_interval: float = POLL_INTERVAL):
+    # the supervisor's handlers would otherwise keep a worker alive through SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    concurrency.configure_thread_pools()
+
+    last_purge = 0.0
+    while True:
+        if time.time() - last_purge > 60:
+            store.purge()
+            last_purge = time.time()
+
+        job = store.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id, task, params = job
+        try:
+            # tasks yield their parts one by one, so pollers see partial results right away
+            for part, payload in resolve_task(task)(**params):
+                store.add_part(job_id, part, payload)
+            store.set_status(job_id, "done")
+        except Exception as e:
+            logger.warning(f"Job {job_id} ({task}) failed: {e}")
+            store.set_status(job_id, "failed")
+
+
+def supervise(n_workers: int = JOB_WORKERS, interval: float = SUPERVISE_INTERVAL):
+    # runs as its own process next to gunicorn, restarts workers that die and stops with its parent
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    parent_pid = os.getppid()
+
+    workers = [None] * n_workers
+    while not stopping and os.getppid() == parent_pid:
+        for i, worker in enumerate(workers):
+            if worker is not None and worker.is_alive():
+                continue
+            if worker is not None:
+                logger.warning(f"Job worker {worker.name} exited with code {worker.exitcode}, restarting it")
+            workers[i] = multiprocessing.Process(target=run_worker, name=f"job-worker-{i}")
+            workers[i].start()
+        time.sleep(interval)
+
+    for worker in workers:
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+    for worker in workers:
+        if worker is not None:
+            worker.join(timeout=10)
+    logger.info(f"Stopped {n_workers} job worker(s)")
+
+
+def start_supervisor(n_workers: int = JOB_WORKERS) -> Optional[subprocess.Popen]:
+    # the dev server has no start.sh, so it launches the supervisor as a plain child process
+    if n_workers <= 0:
+        return None
+
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, "-m", "utils.job_queue", "--workers", str(n_workers)], cwd=app_dir)
+    logger.info(f"Started the job supervisor (pid {process.pid}) with {n_workers} worker(s) on {JOB_STORE.path}")
+    return process
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the background job workers.")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    supervise(arguments.workers)
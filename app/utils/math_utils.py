@@ -1,3 +1,10 @@
+from functools import lru_cache
+from typing import *
+
+import numpy as np
+
+# roughly 32 MB of float64 work per chunk
+NORM_CHUNK_ELEMENTS = 4 * 1024 * 1024
 
 
 def row_column_permutations(n_rows, n_cols, start=1):
@@ -6,3 +13,128 @@ def row_column_permutations(n_rows, n_cols, start=1):
         for c in range(start, n_cols + start):
             permutations.append((r, c))
     return permutations
+
+
+def lp_norms(
+        vector: np.ndarray,
+        p_values: Union[Sequence[float], np.ndarray],
+        chunk_elements: int = NORM_CHUNK_ELEMENTS
+) -> np.ndarray:
+    a = np.asarray(vector).ravel()
+    p = np.asarray(p_values, dtype=np.float64)
+    norms = np.zeros(p.shape)
+    if a.size == 0:
+        return norms
+
+    positive = np.isfinite(p) & (p > 0)
+    negative = np.isfinite(p) & (p < 0)
+    p_pos = p[positive]
+    p_neg = p[negative]
+
+    # the vector is walked in chunks so the (p values x entries) work matrix stays around chunk_elements,
+    # however long the vector is
+    chunk_size = max(1, chunk_elements // max(1, p_pos.size + p_neg.size))
+
+    # sum((a / a_max) ** p) is kept in log space for the largest entry seen so far,
+    # and rescaled by (old max / new max) ** p whenever a later chunk holds a larger entry
+    a_max, a_min, nonzero = 0.0, np.inf, 0
+    log_sum_pos = np.full(p_pos.shape, -np.inf)
+    log_sum_neg = np.full(p_neg.shape, -np.inf)
+
+    with np.errstate(divide="ignore"):
+        for start in range(0, a.size, chunk_size):
+            chunk = np.abs(a[start:start + chunk_size].astype(np.float64))
+            chunk_max = chunk.max()
+            chunk_min = chunk.min()
+            nonzero += np.count_nonzero(chunk)
+
+            if p_pos.size and chunk_max > 0:
+                if chunk_max > a_max > 0:
+                    log_sum_pos += p_pos * np.log(a_max / chunk_max)
+                a_max = max(a_max, chunk_max)
+                log_ratio = np.log(chunk / a_max)
+                log_sum_pos = np.logaddexp(log_sum_pos, _log_sum_exp(p_pos[:, None] * log_ratio[None, :]))
+            a_max = max(a_max, chunk_max)
+
+            # for negative p the smallest entry dominates, a zero entry makes the norm zero
+            if p_neg.size and a_min > 0:
+                if chunk_min < a_min < np.inf and chunk_min > 0:
+                    log_sum_neg += p_neg * np.log(a_min / chunk_min)
+                a_min = min(a_min, chunk_min)
+                if a_min > 0:
+                    # chunk / a_min can overflow for vectors spanning more than the float range
+                    log_ratio = np.log(chunk) - np.log(a_min)
+                    log_sum_neg = np.logaddexp(log_sum_neg, _log_sum_exp(p_neg[:, None] * log_ratio[None, :]))
+            a_min = min(a_min, chunk_min)
+
+        if a_max > 0:
+            norms[positive] = a_max * np.exp(log_sum_pos / p_pos)
+        if a_min > 0:
+            norms[negative] = a_min * np.exp(log_sum_neg / p_neg)
+
+    norms[p == np.inf] = a_max
+    norms[p == -np.inf] = a_min
+    # same convention as numpy, the "L0 norm" counts the non-zero entries
+    norms[p == 0] = nonzero
+
+    return norms
+
+
+def _log_sum_exp(log_terms: np.ndarray) -> np.ndarray:
+    # every term is <= 1 (log <= 0) after scaling, so the plain sum cannot overflow
+    return np.log(np.exp(log_terms).sum(axis=1))
+
+
+def superellipse_isolines(
+        p: float,
+        radii: Union[Sequence[float], np.ndarray],
+        n_points: int = 400
+) -> Tuple[np.ndarray, np.ndarray]:
+    # |x|^p + |y|^p = r^p is traced by x = r sgn(cos t)|cos t|^(2/p), y = r sgn(sin t)|sin t|^(2/p)
+    t = np.linspace(0, 2 * np.pi, num=n_points)
+    cos_t = np.cos(t)
+    sin_t = np.sin(t)
+    unit_x = np.sign(cos_t) * np.power(np.abs(cos_t), 2 / p)
+    unit_y = np.sign(sin_t) * np.power(np.abs(sin_t), 2 / p)
+
+    radii = np.asarray(radii, dtype=np.float64)[:, None]
+    return radii * unit_x[None, :], radii * unit_y[None, :]
+
+
+@lru_cache(maxsize=48)
+def lp_grid_tile(p: float, tile_size: float, ix: int, iy: int, tile_points: int) -> np.ndarray:
+    # tiles are aligned to multiples of tile_size, so the same tile is reused while panning
+    offsets = np.arange(tile_points) * (tile_size / tile_points)
+    x = ix * tile_size + offsets
+    y = iy * tile_size + offsets
+    tile = (np.power(np.abs(x)[None, :], p) + np.power(np.abs(y)[:, None], p)).astype(np.float32)
+    tile.setflags(write=False)
+    return tile
+
+
+def lp_grid_window(
+        p: float,
+        x_range: Tuple[float, float],
+        y_range: Tuple[float, float],
+        tile_points: int = 512,
+        domain_size: float = 10.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # pick the tile size so the visible window spans between half and one tile,
+    # which keeps roughly tile_points samples across the viewport at any zoom level
+    width = max(x_range[1] - x_range[0], y_range[1] - y_range[0])
+    level = int(np.floor(np.log2(domain_size / width)))
+    tile_size = domain_size / 2 ** level
+    step = tile_size / tile_points
+
+    ix_range = range(int(np.floor(x_range[0] / tile_size)), int(np.floor(x_range[1] / tile_size)) + 1)
+    iy_range = range(int(np.floor(y_range[0] / tile_size)), int(np.floor(y_range[1] / tile_size)) + 1)
+    z = np.block([
+        [lp_grid_tile(p, tile_size, ix, iy, tile_points) for ix in ix_range] for iy in iy_range
+    ])
+    x = ix_range[0] * tile_size + np.arange(z.shape[1]) * step
+    y = iy_range[0] * tile_size + np.arange(z.shape[0]) * step
+
+    # crop the assembled tiles back to the visible window
+    x_mask = (x >= x_range[0] - step) & (x <= x_range[1] + step)
+    y_mask = (y >= y_range[0] - step) & (y <= y_range[1] + step)
+    return x[x_mask], y[y_mask], z[np.ix_(y_mask, x_mask)]
@@ -0,0 +1,367 @@
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from numbers import Number
+from typing import *
+
+import dash
+import flask
+import numpy as np
+
+from utils import convenience_functions, fit_executor
+
+logger = logging.getLogger("memoization-logger")
+logger.setLevel(logging.INFO)
+
+MEMO_ENABLED = os.environ.get("MEMO", "1") == "1"
+MEMO_MEMORY_BYTES = int(os.environ.get("MEMO_MEMORY_BYTES", str(64 * 1024 * 1024)))
+# every gunicorn worker on the machine reads and writes the same directory, and it outlives restarts
+# entries are unpickled, so it is only used when it belongs to this user and nobody else can write to it
+MEMO_DIR = os.environ.get("MEMO_DIR", "/tmp/eigenvo_memo")
+MEMO_DISK_ENABLED = os.environ.get("MEMO_DISK", "1") == "1"
+MEMO_DISK_BYTES = int(os.environ.get("MEMO_DISK_BYTES", str(512 * 1024 * 1024)))
+MEMO_DISK_TTL = float(os.environ.get("MEMO_DISK_TTL", str(24 * 60 * 60)))
+# bump on deploys that change what a callback returns, entries written by older code are then never read
+MEMO_VERSION = os.environ.get("MEMO_VERSION", "")
+# other workers write to the directory too, so its size is recounted at least this often
+DISK_SCAN_INTERVAL = 60.0
+MISSING = object()
+
+
+def _update_hash(hasher, value: Any):
+    # every value is written with a type tag and a length, so ["ab"] and ["a", "b"] never collide
+    if value is None:
+        hasher.update(b"N")
+    elif isinstance(value, (bool, np.bool_)):
+        hasher.update(b"T" if value else b"F")
+    elif isinstance(value, np.ndarray) and value.dtype.kind != "O":
+        array = np.ascontiguousarray(value)
+        header = f"{array.dtype.str}{array.shape}".encode("utf-8")
+        hasher.update(b"A" + struct.pack("<Q", len(header)) + header)
+        hasher.update(array.data)
+    elif isinstance(value, (Number, np.number)):
+        # 2 and 2.0 arrive from different inputs but mean the same thing to a callback
+        whole = isinstance(value, (int, np.integer))
+        if whole or (isinstance(value, (float, np.floating)) and float(value).is_integer()):
+            data = b"I" + str(int(value)).encode("ascii")
+        else:
+            data = b"R" + repr(complex(value)).encode("ascii")
+        hasher.update(struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        hasher.update(b"S" + struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, (bytes, bytearray)):
+        hasher.update(b"B" + struct.pack("<Q", len(value)) + value)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"L" + struct.pack("<Q", len(value)))
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(b"D" + struct.pack("<Q", len(value)))
+        for key in sorted(value, key=str):
+            _update_hash(hasher, str(key))
+            _update_hash(hasher, value[key])
+    else:
+        raise TypeError(f"cannot hash {type(value).__name__} arguments")
+
+
+def canonical_hash(*values: Any) -> str:
+    hasher = hashlib.sha256()
+    for value in values:
+        _update_hash(hasher, value)
+    return hasher.hexdigest()
+
+
+class MemoryTier:
+    def __init__(self, max_bytes: int = MEMO_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int) -> int:
+        # returns how many entries were evicted to make room
+        if size > self.max_bytes:
+            return 0
+
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class DiskTier:
+    def __init__(
+            self,
+            directory: str = MEMO_DIR,
+            max_bytes: int = MEMO_DISK_BYTES,
+            ttl: float = MEMO_DISK_TTL,
+            suffix: str = ".pkl"
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.suffix = suffix
+        self._size = None
+        self._last_scan = 0.0
+        self._private = None
+        self._lock = threading.Lock()
+
+    def usable(self) -> bool:
+        if self._private is None:
+            self._private = convenience_functions.ensure_private_directory(self.directory)
+            if not self._private:
+                logger.warning(f"{self.directory} is not a private directory of this user, the disk tier is disabled")
+        return self._private
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        # returns the stored bytes and whether an expired entry was dropped
+        if not self.usable():
+            return None, False
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            now = time.time()
+            if now - stat.st_mtime > self.ttl:
+                os.remove(path)
+                return None, True
+            with open(path, "rb") as f:
+                data = f.read()
+            # the access time orders evictions, the modification time keeps counting towards the ttl
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+            return data, False
+        except OSError:
+            return None, False
+
+    def put(self, key: str, data: bytes) -> int:
+        if len(data) > self.max_bytes or not self.usable():
+            return 0
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+            rescan = (
+                self._size is None or self._size > self.max_bytes or time.time() - self._last_scan > DISK_SCAN_INTERVAL
+            )
+        return self._enforce_limits() if rescan else 0
+
+    def _enforce_limits(self) -> int:
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.directory) as scanned:
+                for entry in scanned:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    # leftovers of writes that died halfway are dropped along with expired entries
+                    if now - stat.st_mtime > self.ttl or (entry.name.endswith(".tmp") and now - stat.st_mtime > 60):
+                        entries.append((0.0, stat.st_size, entry.path))
+                    elif entry.name.endswith(self.suffix):
+                        entries.append((stat.st_atime, stat.st_size, entry.path))
+        except OSError:
+            return 0
+
+        # expired entries sort first, then the least recently read, until the directory is back under 90% of the cap
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for accessed, size, path in entries:
+            if accessed > 0 and total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+            total -= size
+
+        with self._lock:
+            self._size = total
+            self._last_scan = now
+        return evicted
+
+    def clear(self):
+        if not self.usable():
+            return
+        try:
+            with os.scandir(self.directory) as scanned:
+                for entry in scanned:
+                    if entry.name.endswith(self.suffix):
+                        os.remove(entry.path)
+        except OSError:
+            pass
+        with self._lock:
+            self._size = 0
+
+
+class Memoizer:
+    def __init__(
+            self,
+            memory: MemoryTier = None,
+            disk: Optional[DiskTier] = None
+    ):
+        self.memory = memory if memory is not None else MemoryTier()
+        self.disk = disk
+        # (function, event) -> count, events are memory_hit, disk_hit, miss, memory_eviction and disk_eviction
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, event: str, n: int = 1):
+        if n:
+            with self._lock:
+                self._counters[(name, event)] += n
+
+    def counters(self) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return dict(self._counters)
+
+    @staticmethod
+    def make_key(
+            name: str,
+            args: tuple,
+            kwargs: dict,
+            triggered: Sequence[str] = (),
+            depends_on: Sequence[str] = ()
+    ) -> Optional[str]:
+        # files a result is derived from are keyed by their size and modification time
+        files = []
+        for path in depends_on:
+            try:
+                stat = os.stat(path)
+                files.append([path, stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                files.append([path, None, None])
+
+        try:
+            return canonical_hash(MEMO_VERSION, name, sorted(triggered), list(args), kwargs, files)
+        except TypeError as e:
+            logger.debug(f"Not memoizing {name}: {e}")
+            return None
+
+    def get(self, name: str, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self._count(name, "memory_hit")
+            return value
+
+        if self.disk is not None:
+            data, expired = self.disk.get(key)
+            self._count(name, "disk_eviction", int(expired))
+            if data is not None:
+                try:
+                    value = pickle.loads(data)
+                except Exception as e:
+                    logger.warning(f"Dropping unreadable memo entry {key[:12]} of {name}: {e}")
+                else:
+                    self._count(name, "disk_hit")
+                    self._count(name, "memory_eviction", self.memory.put(key, value, len(data)))
+                    return value
+
+        self._count(name, "miss")
+        return MISSING
+
+    def put(self, name: str, key: str, value: Any):
+        # coalesced requests all finish with the same result, only the first one has to store it
+        if key in self.memory:
+            return
+
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not memoize the result of {name}: {e}")
+            return
+
+        self._count(name, "memory_eviction", self.memory.put(key, value, len(data)))
+        if self.disk is not None:
+            try:
+                self._count(name, "disk_eviction", self.disk.put(key, data))
+            except OSError as e:
+                logger.warning(f"Could not write memo entry {key[:12]} to {self.disk.directory}: {e}")
+
+    def call(
+            self,
+            name: str,
+            f: Callable,
+            args: tuple,
+            kwargs: dict,
+            key_on_triggered: bool = True,
+            depends_on: Sequence[str] = ()
+    ) -> Any:
+        if not MEMO_ENABLED:
+            return f(*args, **kwargs)
+
+        # callbacks that branch on which input fired need the triggering props in the key
+        triggered = []
+        if key_on_triggered and flask.has_request_context():
+            triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+
+        key = self.make_key(name, args, kwargs, triggered, depends_on)
+        if key is None:
+            return f(*args, **kwargs)
+
+        value = self.get(name, key)
+        if value is MISSING:
+            timeouts = fit_executor.thread_timeouts()
+            value = f(*args, **kwargs)
+            # results built from fits that timed out are partial, they are returned but never stored
+            if fit_executor.thread_timeouts() == timeouts:
+                self.put(name, key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP dash_memo_events_total Memoized callback lookups and evictions per tier.",
+            "# TYPE dash_memo_events_total counter",
+        ]
+        for (name, event), count in sorted(self.counters().items()):
+            lines.append(f'dash_memo_events_total{{function="{name}",event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+MEMO_CACHE = Memoizer(disk=DiskTier() if MEMO_DISK_ENABLED else None)
@@ -0,0 +1,101 @@
+import os
+from numbers import Number
+from typing import *
+
+import numpy as np
+
+# 0 turns rounding off, plotly only draws a few hundred pixels so 5 digits is indistinguishable on screen
+SIGNIFICANT_DIGITS = int(os.environ.get("PAYLOAD_SIGNIFICANT_DIGITS", "5"))
+# trace types that accept x0/dx and y0/dy in place of an evenly spaced coordinate array
+STEPPED_TRACE_TYPES = {"scatter", "scattergl", "bar", "contour", "heatmap", "heatmapgl"}
+MIN_ARRAY_SIZE = 8
+
+
+def round_significant(values: np.ndarray, digits: int = SIGNIFICANT_DIGITS) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values) & (values != 0)
+    if digits <= 0 or not finite.any():
+        return values
+
+    # dividing by an exact power of ten gives the double closest to the rounded decimal,
+    # so the json encoder prints it with at most `digits` digits
+    decimals = np.zeros(values.shape, dtype=np.int64)
+    decimals[finite] = digits - 1 - np.floor(np.log10(np.abs(values[finite]))).astype(np.int64)
+    scale = np.power(10.0, np.abs(decimals))
+    with np.errstate(invalid="ignore", over="ignore"):
+        rounded = np.where(
+            decimals >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale
+        )
+    return np.where(finite, rounded, values)
+
+
+def compact_array(values: Any, digits: int = SIGNIFICANT_DIGITS) -> Any:
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind not in "fiu":
+            return values
+    elif not (
+            isinstance(values, (list, tuple))
+            and len(values) >= MIN_ARRAY_SIZE
+            and all(isinstance(v, Number) and not isinstance(v, bool) for v in values)
+    ):
+        return values
+
+    array = np.asarray(values)
+    if array.size < MIN_ARRAY_SIZE or array.dtype.kind in "iu":
+        return array
+
+    # whole numbers print as 3 instead of 3.0
+    finite = np.isfinite(array)
+    if finite.all() and np.all(array == np.rint(array)) and np.abs(array).max() < 2 ** 53:
+        return array.astype(np.int64)
+    return round_significant(array, digits)
+
+
+def even_step(values: Any) -> Optional[Tuple[float, float]]:
+    array = np.asarray(values)
+    if array.ndim != 1 or array.size < MIN_ARRAY_SIZE or array.dtype.kind not in "fiu":
+        return None
+
+    steps = np.diff(array.astype(np.float64))
+    if not np.all(np.isfinite(steps)) or steps[0] == 0 or not np.allclose(steps, steps[0], rtol=1e-9, atol=0):
+        return None
+    return float(array[0]), float(steps[0])
+
+
+def slim_values(values: dict, digits: int = SIGNIFICANT_DIGITS) -> dict:
+    slimmed = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            slimmed[key] = slim_values(value, digits)
+        elif isinstance(value, list) and value and isinstance(value[0], (list, np.ndarray)):
+            # matrices such as contour z built from nested lists
+            slimmed[key] = compact_array(np.asarray(value), digits) if _is_numeric(value) else value
+        else:
+            slimmed[key] = compact_array(value, digits)
+    return slimmed
+
+
+def _is_numeric(values: Any) -> bool:
+    try:
+        return np.asarray(values).dtype.kind in "fiu"
+    except ValueError:
+        return False
+
+
+def slim_trace(trace: dict, digits: int = SIGNIFICANT_DIGITS) -> dict:
+    trace = dict(trace)
+
+    # evenly spaced coordinates are sent as a start and a step instead of every value
+    if trace.get("type", "scatter") in STEPPED_TRACE_TYPES:
+        for axis in ("x", "y"):
+            if axis in trace and f"{axis}0" not in trace and f"d{axis}" not in trace:
+                step = even_step(trace[axis])
+                if step is not None:
+                    del trace[axis]
+                    trace[f"{axis}0"], trace[f"d{axis}"] = step
+
+    return slim_values(trace, digits)
+
+
+def slim_figure(figure: dict, digits: int = SIGNIFICANT_DIGITS) -> dict:
+    return {**figure, "data": [slim_trace(trace, digits) for trace in figure.get("data", [])]}
\ No newline at end of file
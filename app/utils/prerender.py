@@ -0,0 +1,80 @@
+import json
+import logging
+from typing import *
+
+from utils import fit_executor, payload_utils
+
+logger = logging.getLogger("prerender-logger")
+logger.setLevel(logging.INFO)
+
+
+class FigureRegistry:
+    def __init__(self):
+        self._builders = {}
+        self._default_args = {}
+        self._prerender_args = {}
+        self._figures = {}
+
+    @staticmethod
+    def make_key(graph_id: str, args: Sequence[Any]) -> str:
+        return json.dumps([graph_id, list(args)], sort_keys=True, default=str)
+
+    def register(
+            self,
+            graph_id: str,
+            builder: Callable,
+            default_args: Sequence[Any] = (),
+            prerender_args: Optional[Callable[[], Iterable[Sequence[Any]]]] = None
+    ):
+        # prerender_args is called lazily so registering never loads any data
+        self._builders[graph_id] = builder
+        self._default_args[graph_id] = tuple(default_args)
+        self._prerender_args[graph_id] = prerender_args
+
+    def _build(self, graph_id: str, args: Sequence[Any]) -> dict:
+        return payload_utils.slim_figure(self._builders[graph_id](*args).to_dict())
+
+    def _build_complete(self, graph_id: str, args: Sequence[Any]) -> Tuple[dict, bool]:
+        # figures whose fits timed out are served but never kept
+        timeouts = fit_executor.thread_timeouts()
+        figure = self._build(graph_id, args)
+        return figure, fit_executor.thread_timeouts() == timeouts
+
+    def prerender(self):
+        for graph_id in self._builders:
+            args_list = [self._default_args[graph_id]]
+            if self._prerender_args[graph_id] is not None:
+                args_list.extend(self._prerender_args[graph_id]())
+
+            for args in args_list:
+                try:
+                    figure, complete = self._build_complete(graph_id, args)
+                    if complete:
+                        self._figures[self.make_key(graph_id, args)] = figure
+                except Exception as e:
+                    logger.warning(f"Could not prerender {graph_id} for {args}: {e}")
+
+        logger.info(f"Prerendered {len(self._figures)} figures")
+
+    def clear(self):
+        self._figures.clear()
+
+    def figure(self, graph_id: str, *args) -> dict:
+        # only prerendered figures are kept, anything else is built on demand
+        figure = self._figures.get(self.make_key(graph_id, args))
+        if figure is None:
+            figure = self._build(graph_id, args)
+        return figure
+
+    def default_figure(self, graph_id: str) -> dict:
+        args = self._default_args[graph_id]
+        key = self.make_key(graph_id, args)
+        if key not in self._figures:
+            figure, complete = self._build_complete(graph_id, args)
+            if not complete:
+                return figure
+            self._figures[key] = figure
+        return self._figures[key]
+
+
+FIGURES = FigureRegistry()
\ No newline at end of file
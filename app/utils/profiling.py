@@ -0,0 +1,153 @@
+import cProfile
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import *
+
+import flask
+
+logger = logging.getLogger("profiling-logger")
+logger.setLevel(logging.INFO)
+
+CALLBACK_PATH = "/_dash-update-component"
+PROFILING_ENABLED = os.environ.get("PROFILING", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/eigenvo_profiles")
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+# "sample" writes folded stacks for flamegraph.pl / speedscope, "cprofile" writes pstats files for snakeviz
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample")
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.001"))
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @staticmethod
+    def _folded(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._folded(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class DeterministicProfiler:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self, path: str):
+        self._profile.dump_stats(path)
+
+
+class RequestProfiler:
+    def __init__(self, output_dir: str = PROFILE_DIR, mode: str = PROFILE_MODE, header: str = PROFILE_HEADER):
+        self.output_dir = output_dir
+        self.mode = mode
+        self.header = header
+        # only one deterministic profiler can be active per process
+        self._cprofile_lock = threading.Lock()
+
+    @staticmethod
+    def profile_key() -> str:
+        request = flask.request
+        if request.method == "POST" and request.path == CALLBACK_PATH:
+            payload = request.get_json(silent=True) or {}
+            name = payload.get("output", "callback")
+            inputs = request.get_data(cache=True)
+        else:
+            name = request.path
+            inputs = request.query_string
+
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_.")[:100] or "root"
+        return f"{name}-{hashlib.sha256(inputs).hexdigest()[:12]}"
+
+    def _before_request(self):
+        if not flask.request.headers.get(self.header):
+            return None
+
+        if self.mode == "cprofile":
+            if not self._cprofile_lock.acquire(blocking=False):
+                logger.info(f"Profiler busy, not profiling {flask.request.path}")
+                return None
+            profiler = DeterministicProfiler()
+        else:
+            profiler = StackSampler(threading.get_ident())
+
+        flask.g.profiler = profiler
+        flask.g.profile_start = time.perf_counter()
+        profiler.start()
+        return None
+
+    def _after_request(self, response: flask.Response) -> flask.Response:
+        profiler = flask.g.pop("profiler", None)
+        if profiler is None:
+            return response
+
+        profiler.stop()
+        if isinstance(profiler, DeterministicProfiler):
+            self._cprofile_lock.release()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        extension = "prof" if isinstance(profiler, DeterministicProfiler) else "folded"
+        path = os.path.join(self.output_dir, f"{self.profile_key()}.{extension}")
+        profiler.dump(path)
+
+        elapsed = time.perf_counter() - flask.g.profile_start
+        logger.info(f"Profiled {flask.request.path} in {elapsed * 1000:.1f} ms, wrote {path}")
+        response.headers["X-Profile-File"] = os.path.basename(path)
+        return response
+
+    def _teardown_request(self, exception: Optional[BaseException]):
+        # a request that failed before after_request still has to stop its profiler
+        profiler = flask.g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            if isinstance(profiler, DeterministicProfiler):
+                self._cprofile_lock.release()
+
+    def init_app(self, server: flask.Flask):
+        # nothing is registered unless profiling is switched on, so requests pay nothing by default
+        if not PROFILING_ENABLED:
+            return
+
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+        server.teardown_request(self._teardown_request)
+        logger.info(f"Profiling requests sent with {self.header} into {self.output_dir} ({self.mode})")
+
+
+REQUEST_PROFILER = RequestProfiler()
\ No newline at end of file
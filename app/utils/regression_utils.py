@@ -0,0 +1,286 @@
+from functools import lru_cache
+from typing import *
+
+import numpy as np
+from sklearn.linear_model import Lasso
+
+from utils.fit_executor import FitExecutor
+
+
+def ridge_path(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    alphas = np.asarray(alphas, dtype=np.float64)
+    x_mean = x.mean(axis=0)
+    y_mean = y.mean()
+
+    # a single SVD of the centered design matrix gives the ridge solution for every alpha
+    u, s, vt = np.linalg.svd(x - x_mean, full_matrices=False)
+    uty = u.T @ (y - y_mean)
+
+    denominator = s[None, :] ** 2 + alphas[:, None]
+    shrinkage = np.divide(
+        s[None, :], denominator, out=np.zeros_like(denominator), where=denominator > 0
+    )
+    coefs = (shrinkage * uty[None, :]) @ vt
+    intercepts = y_mean - coefs @ x_mean
+    return coefs, intercepts
+
+
+def lasso_path_steps(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: Sequence[float],
+        max_iter: int = 2000
+) -> Iterator[Tuple[int, np.ndarray, float]]:
+    alphas = np.asarray(alphas, dtype=np.float64)
+
+    # walk the alphas from most to least regularized, starting each fit from the previous solution
+    model = Lasso(max_iter=max_iter, warm_start=True)
+    for i in np.argsort(alphas)[::-1]:
+        model.set_params(alpha=alphas[i])
+        model.fit(x, y)
+        yield i, model.coef_.copy(), model.intercept_
+
+
+def _lasso_warm_path(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: np.ndarray,
+        max_iter: int = 2000
+) -> Tuple[np.ndarray, np.ndarray]:
+    coefs = np.zeros((len(alphas), x.shape[1]))
+    intercepts = np.zeros(len(alphas))
+    for i, coef, intercept in lasso_path_steps(x, y, alphas, max_iter=max_iter):
+        coefs[i] = coef
+        intercepts[i] = intercept
+
+    return coefs, intercepts
+
+
+def lasso_path(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: Sequence[float],
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    alphas = np.asarray(alphas, dtype=np.float64)
+    if executor is None or executor.max_workers <= 1 or len(alphas) < 2:
+        return _lasso_warm_path(x, y, alphas, max_iter=max_iter)
+
+    # split the descending path into contiguous segments, each segment is warm started on its own
+    # and the segments are fitted in parallel (coordinate descent releases the GIL)
+    order = np.argsort(alphas)[::-1]
+    segments = np.array_split(order, min(executor.max_workers, len(alphas)))
+    results = executor.map(lambda segment: _lasso_warm_path(x, y, alphas[segment], max_iter=max_iter), segments)
+
+    # segments that timed out are left as nan, which shows up as an empty panel
+    coefs = np.full((len(alphas), x.shape[1]), np.nan)
+    intercepts = np.full(len(alphas), np.nan)
+    for segment, result in zip(segments, results):
+        if result is not None:
+            coefs[segment], intercepts[segment] = result
+
+    return coefs, intercepts
+
+
+def regularization_path(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: Sequence[float],
+        kind: str,
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    path_selector = {
+        "lasso": lambda: lasso_path(x, y, alphas, max_iter=max_iter, executor=executor),
+        "ridge": lambda: ridge_path(x, y, alphas),
+    }
+    return path_selector[kind.lower()]()
+
+
+def path_predictions(
+        x: np.ndarray,
+        coefs: np.ndarray,
+        intercepts: np.ndarray
+) -> np.ndarray:
+    # one row of predictions per alpha
+    return coefs @ x.T + intercepts[:, None]
+
+
+# vandermonde-style generators, each returns the constant column followed by degrees 1..n
+BASIS_VANDER = {
+    "monomial": np.polynomial.polynomial.polyvander,
+    "legendre": np.polynomial.legendre.legvander,
+    "chebyshev": np.polynomial.chebyshev.chebvander,
+}
+
+
+@lru_cache(maxsize=128)
+def _basis_features(x_bytes: bytes, degree: int, basis: str) -> np.ndarray:
+    x = np.frombuffer(x_bytes, dtype=np.float64)
+    if basis == "monomial":
+        # standardize to have mean of 0 and std of 1
+        x = (x - x.mean()) / x.std()
+    else:
+        # legendre and chebyshev polynomials are orthogonal on [-1, 1]
+        x_min, x_max = x.min(), x.max()
+        x = 2 * (x - x_min) / (x_max - x_min) - 1 if x_max > x_min else np.zeros_like(x)
+
+    # drop the constant column, the models fit their own intercept
+    features = BASIS_VANDER[basis](x, degree)[:, 1:]
+    features.setflags(write=False)
+    return features
+
+
+def basis_features(
+        x_raw: np.ndarray,
+        degree: int,
+        basis: str = "monomial"
+) -> np.ndarray:
+    x = np.ascontiguousarray(x_raw, dtype=np.float64).ravel()
+    return _basis_features(x.tobytes(), int(degree), basis.lower())
+
+
+def poly_fit_path(
+        x_raw: np.ndarray,
+        y: np.ndarray,
+        degree: int,
+        kind: str,
+        alphas: Sequence[float],
+        basis: str = "monomial",
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # transform features into an n-degree polynomial space
+    x_poly = basis_features(x_raw, degree, basis)
+
+    # fit every alpha from one factorization (ridge) or one warm-started path (lasso)
+    coefs, intercepts = regularization_path(x_poly, y, alphas, kind, max_iter=max_iter, executor=executor)
+    predictions = path_predictions(x_poly, coefs, intercepts)
+    return coefs, intercepts, predictions
+
+
+def multi_target_path(
+        x: np.ndarray,
+        y: np.ndarray,
+        alphas: Sequence[float],
+        kind: str,
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    # y holds one column per target, returns coefs (alphas, targets, features) and intercepts (alphas, targets)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    if kind.lower() == "ridge":
+        # the SVD only depends on the design matrix, so every target shares it
+        x_mean = x.mean(axis=0)
+        y_mean = y.mean(axis=0)
+        u, s, vt = np.linalg.svd(x - x_mean, full_matrices=False)
+        uty = u.T @ (y - y_mean)
+
+        denominator = s[None, :] ** 2 + alphas[:, None]
+        shrinkage = np.divide(s[None, :], denominator, out=np.zeros_like(denominator), where=denominator > 0)
+        coefs = np.einsum("as,st,sf->atf", shrinkage, uty, vt)
+        intercepts = y_mean[None, :] - coefs @ x_mean
+        return coefs, intercepts
+
+    # lasso fits every target of a block in one multi-output warm-started path,
+    # the blocks of targets are fitted in parallel
+    n_blocks = 1 if executor is None else max(1, min(executor.max_workers, y.shape[1]))
+    blocks = np.array_split(np.arange(y.shape[1]), n_blocks)
+
+    def fit_block(targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        block_coefs = np.zeros((len(alphas), len(targets), x.shape[1]))
+        block_intercepts = np.zeros((len(alphas), len(targets)))
+        for i, coef, intercept in lasso_path_steps(x, y[:, targets], alphas, max_iter=max_iter):
+            block_coefs[i] = coef
+            block_intercepts[i] = intercept
+        return block_coefs, block_intercepts
+
+    results = [fit_block(blocks[0])] if executor is None else executor.map(fit_block, blocks)
+
+    coefs = np.full((len(alphas), y.shape[1], x.shape[1]), np.nan)
+    intercepts = np.full((len(alphas), y.shape[1]), np.nan)
+    for targets, result in zip(blocks, results):
+        if result is not None:
+            coefs[:, targets], intercepts[:, targets] = result
+
+    return coefs, intercepts
+
+
+def batch_poly_fit_path(
+        x_raw: np.ndarray,
+        y: np.ndarray,
+        degree: int,
+        kind: str,
+        alphas: Sequence[float],
+        basis: str = "monomial",
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # same as poly_fit_path for a (samples, targets) matrix, predictions are (alphas, targets, samples)
+    x_poly = basis_features(x_raw, degree, basis)
+    coefs, intercepts = multi_target_path(x_poly, y, alphas, kind, max_iter=max_iter, executor=executor)
+    predictions = coefs @ x_poly.T + intercepts[:, :, None]
+    return coefs, intercepts, predictions
+
+
+def kfold_indices(
+        n_samples: int,
+        n_folds: int = 5,
+        seed: int = 0
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # shuffled folds, every sample is validated exactly once
+    order = np.random.default_rng(seed).permutation(n_samples)
+    folds = np.array_split(order, min(n_folds, n_samples))
+    return [
+        (np.sort(np.concatenate(folds[:i] + folds[i + 1:])), np.sort(fold)) for i, fold in enumerate(folds)
+    ]
+
+
+def cross_validation_grid(
+        x_raw: np.ndarray,
+        y: np.ndarray,
+        degrees: Sequence[int],
+        alphas: Sequence[float],
+        kinds: Sequence[str] = ("lasso", "ridge"),
+        basis: str = "monomial",
+        n_folds: int = 5,
+        max_iter: int = 2000,
+        executor: Optional[FitExecutor] = None
+) -> np.ndarray:
+    degrees = [int(d) for d in degrees]
+    alphas = np.asarray(alphas, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).ravel()
+
+    # every basis is nested, so each degree's features are a prefix of the columns at the highest degree,
+    # and the fold splits of that one matrix are shared by the whole grid
+    x_poly = basis_features(x_raw, max(degrees), basis)
+    folds = [(x_poly[train], y[train], x_poly[val], y[val]) for train, val in kfold_indices(len(y), n_folds)]
+
+    def validation_errors(task: Tuple[str, int, tuple]) -> np.ndarray:
+        kind, degree, (x_train, y_train, x_val, y_val) = task
+        coefs, intercepts = regularization_path(x_train[:, :degree], y_train, alphas, kind, max_iter=max_iter)
+        residuals = path_predictions(x_val[:, :degree], coefs, intercepts) - y_val[None, :]
+        return (residuals ** 2).sum(axis=1)
+
+    # one task per (model, degree, fold) covers every alpha, ridge from one SVD and lasso from one warm path
+    tasks = [(kind, degree, fold) for kind in kinds for degree in degrees for fold in folds]
+    if executor is None:
+        results = [validation_errors(task) for task in tasks]
+    else:
+        results = executor.map(validation_errors, tasks)
+
+    squared_errors = np.full((len(tasks), len(alphas)), np.nan)
+    for i, result in enumerate(results):
+        if result is not None:
+            squared_errors[i] = result
+
+    # root mean squared validation error per (model, degree, alpha), nan where a fold timed out
+    squared_errors = squared_errors.reshape(len(kinds), len(degrees), len(folds), len(alphas))
+    return np.sqrt(squared_errors.sum(axis=2) / len(y))
\ No newline at end of file
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import *
+
+import flask
+
+logger = logging.getLogger("response-cache-logger")
+logger.setLevel(logging.INFO)
+
+CALLBACK_PATH = "/_dash-update-component"
+
+
+def no_store():
+    # called from callbacks with side effects (submitting or polling a job), their responses are never reused
+    if flask.has_request_context():
+        flask.g.callback_no_store = True
+
+
+class CallbackResponseCache:
+    def __init__(
+            self,
+            max_entries: int = int(os.environ.get("CALLBACK_CACHE_ENTRIES", "1024")),
+            max_bytes: int = int(os.environ.get("CALLBACK_CACHE_BYTES", str(64 * 1024 * 1024))),
+            max_age: int = int(os.environ.get("CALLBACK_CACHE_MAX_AGE", "3600"))
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # entries are dropped after the same time browsers and nginx are told to keep them
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(body: bytes) -> Optional[str]:
+        # callbacks are pure, so the callback id and its inputs (the whole request body) address the response
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[3] > self.max_age:
+                self._size -= len(self._entries.pop(key)[1])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[:3]
+
+    def put(self, key: str, etag: str, body: bytes, mimetype: str):
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key)[1])
+            self._entries[key] = (etag, body, mimetype, time.time())
+            self._size += len(body)
+
+            # evict the least recently used responses until both bounds hold
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_body, _, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted_body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _cache_headers(self, etag: str) -> Dict[str, str]:
+        return {"ETag": f'"{etag}"', "Cache-Control": f"public, max-age={self.max_age}"}
+
+    def _before_request(self):
+        if flask.request.method != "POST" or flask.request.path != CALLBACK_PATH:
+            return None
+
+        key = self.make_key(flask.request.get_data(cache=True))
+        flask.g.callback_cache_key = key
+        if key is None:
+            return None
+
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        etag, body, mimetype = entry
+        flask.g.callback_cache_hit = True
+        if etag in flask.request.if_none_match:
+            return flask.Response(status=304, headers=self._cache_headers(etag))
+        return flask.Response(body, mimetype=mimetype, headers=self._cache_headers(etag))
+
+    def _after_request(self, response: flask.Response) -> flask.Response:
+        if flask.g.get("callback_no_store"):
+            # also keeps nginx and the browser from storing it
+            response.headers["Cache-Control"] = "no-store"
+            return response
+
+        key = flask.g.get("callback_cache_key")
+        if key is None or flask.g.get("callback_cache_hit") or response.status_code != 200:
+            return response
+
+        if response.direct_passthrough or response.is_streamed:
+            return response
+
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        self.put(key, etag, body, response.mimetype)
+        response.headers.update(self._cache_headers(etag))
+
+        if etag in flask.request.if_none_match:
+            return flask.Response(status=304, headers=self._cache_headers(etag))
+        return response
+
+    def init_app(self, server: flask.Flask):
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+
+
+CALLBACK_RESPONSE_CACHE = CallbackResponseCache()
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import *
+
+import dash
+import flask
+from dash.exceptions import PreventUpdate
+
+from utils import concurrency, convenience_functions, fit_executor
+
+try:
+    import fcntl
+except ImportError:
+    # no flock on windows, flights are then only shared between the threads of one worker
+    fcntl = None
+
+logger = logging.getLogger("single-flight-logger")
+logger.setLevel(logging.INFO)
+
+# only a single sync worker serves one request at a time, then nothing can join its flights or supersede a
+# keystroke while it waits and the window would only add latency, several workers share flights through the directory
+SINGLE_FLIGHT_ENABLED = os.environ.get(
+    "SINGLE_FLIGHT", "1" if concurrency.WORKERS * concurrency.THREADS > 1 else "0"
+) == "1"
+# lock and result files live here, every gunicorn worker on the machine has to see the same directory
+# results are unpickled from it, so it is only used when it belongs to this user and nobody else can write to it
+SINGLE_FLIGHT_DIR = os.environ.get("SINGLE_FLIGHT_DIR", "/tmp/eigenvo_single_flight")
+SINGLE_FLIGHT_SHARED = os.environ.get("SINGLE_FLIGHT_SHARED", "1") == "1" and fcntl is not None
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", "60"))
+# how long a keystroke request waits for a newer one from the same client before it starts computing
+SUPERSEDE_WINDOW = float(os.environ.get("SUPERSEDE_WINDOW", "0.1"))
+CLIENT_COOKIE = os.environ.get("CLIENT_COOKIE", "eigenvo-client")
+MAX_CLIENTS = 10000
+LOCK_POLL_INTERVAL = 0.01
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        # set when a fit timed out while the leader computed the result
+        self.partial = False
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(
+            self,
+            directory: str = SINGLE_FLIGHT_DIR,
+            shared: bool = SINGLE_FLIGHT_SHARED,
+            timeout: float = SINGLE_FLIGHT_TIMEOUT,
+            supersede_window: float = SUPERSEDE_WINDOW
+    ):
+        self.directory = directory
+        self.shared = shared
+        self.timeout = timeout
+        self.supersede_window = supersede_window
+        self.leaders = 0
+        self.followers = 0
+        self.superseded = 0
+        self._private = None
+        self._flights = {}
+        # (client, callback) slot -> arrival time of the newest keystroke request
+        self._latest = OrderedDict()
+        self._last_purge = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, args: tuple, kwargs: dict, triggered: Sequence[str]) -> str:
+        # the triggering props are part of the key, the wrapped callback may branch on them
+        canonical = json.dumps(
+            [name, sorted(triggered), list(args), kwargs], sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _use_directory(self) -> bool:
+        if not self.shared:
+            return False
+        if self._private is None:
+            self._private = convenience_functions.ensure_private_directory(self.directory)
+            if not self._private:
+                logger.warning(
+                    f"{self.directory} is not a private directory of this user, flights are only shared within a worker"
+                )
+        return self._private
+
+    def _client_slot(self, name: str) -> Optional[str]:
+        client = flask.request.cookies.get(CLIENT_COOKIE)
+        if not client:
+            return None
+        return hashlib.sha256(f"{client}|{name}".encode("utf-8")).hexdigest()
+
+    def _mark_latest(self, slot: str) -> int:
+        token = time.time_ns()
+        with self._lock:
+            self._latest[slot] = token
+            self._latest.move_to_end(slot)
+            while len(self._latest) > MAX_CLIENTS:
+                self._latest.popitem(last=False)
+
+        # the next keystroke may land on another worker
+        if self._use_directory():
+            try:
+                self._write_atomic(self._path(slot, ".latest"), str(token).encode("ascii"))
+            except OSError as e:
+                logger.warning(f"Could not record the latest request in {self.directory}: {e}")
+        return token
+
+    def _is_superseded(self, slot: str, token: int) -> bool:
+        with self._lock:
+            if self._latest.get(slot, token) > token:
+                return True
+
+        if self._use_directory():
+            try:
+                with open(self._path(slot, ".latest"), "rb") as f:
+                    return int(f.read()) > token
+            except (OSError, ValueError):
+                pass
+        return False
+
+    def _acquire(self, lock_file, deadline: float) -> bool:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.time() > deadline:
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    def _compute(compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        timeouts = fit_executor.thread_timeouts()
+        result = compute()
+        return result, fit_executor.thread_timeouts() != timeouts
+
+    def _run_shared(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        result_path = self._path(key, ".result")
+        waiting_path = self._path(key, ".waiting")
+        start = time.time()
+
+        # the flock is released when the file is closed
+        with open(self._path(key, ".lock"), "a+b") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # another worker is computing the same thing, ask it to leave the result behind
+                open(waiting_path, "ab").close()
+                if not self._acquire(lock_file, start + self.timeout):
+                    logger.warning(f"Gave up waiting for flight {key[:12]} after {self.timeout}s")
+                    return self._compute(compute)
+
+                # only a result written while this request waited belongs to the flight it waited on
+                try:
+                    if os.stat(result_path).st_mtime >= start:
+                        with open(result_path, "rb") as f:
+                            result, partial = pickle.load(f)
+                        with self._lock:
+                            self.followers += 1
+                        # the other worker's fits timed out, this request must not cache the result either
+                        if partial:
+                            fit_executor._mark_partial()
+                        return result, partial
+                except (OSError, pickle.UnpicklingError, EOFError, TypeError, ValueError):
+                    pass
+
+            result, partial = self._compute(compute)
+            if os.path.exists(waiting_path):
+                try:
+                    self._write_atomic(result_path, pickle.dumps((result, partial), protocol=pickle.HIGHEST_PROTOCOL))
+                    os.remove(waiting_path)
+                except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+                    logger.warning(f"Could not share the result of flight {key[:12]}: {e}")
+
+        self._purge()
+        return result, partial
+
+    def _purge(self):
+        # removing a lock file another worker is about to open only costs a duplicate computation
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge < self.timeout:
+                return
+            self._last_purge = now
+
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if now - entry.stat().st_mtime > self.timeout:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    def run(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                logger.warning(f"Gave up waiting for flight {key[:12]} after {self.timeout}s")
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            # a partial result is passed on, and so is the leader's decision not to cache it
+            if flight.partial:
+                fit_executor._mark_partial()
+            return flight.result
+
+        try:
+            if self._use_directory():
+                flight.result, flight.partial = self._run_shared(key, compute)
+            else:
+                flight.result, flight.partial = self._compute(compute)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def call(
+            self,
+            name: str,
+            f: Callable,
+            args: tuple,
+            kwargs: dict,
+            supersede_on: Collection[str] = ()
+    ) -> Any:
+        # prerendering and the benchmarks call the callbacks directly
+        if not SINGLE_FLIGHT_ENABLED or not flask.has_request_context():
+            return f(*args, **kwargs)
+
+        triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+
+        # a keystroke waits a moment, if the same client typed again meanwhile the newer request takes over
+        slot = self._client_slot(name) if supersede_on and set(triggered) & set(supersede_on) else None
+        if slot is not None:
+            token = self._mark_latest(slot)
+            time.sleep(self.supersede_window)
+            if self._is_superseded(slot, token):
+                with self._lock:
+                    self.superseded += 1
+                raise PreventUpdate
+
+        key = self.make_key(name, args, kwargs, triggered)
+        return self.run(key, lambda: f(*args, **kwargs))
+
+    def _after_request(self, response: flask.Response) -> flask.Response:
+        # handed out with the page rather than a callback, nginx does not cache responses that set a cookie
+        if response.mimetype == "text/html" and CLIENT_COOKIE not in flask.request.cookies:
+            response.set_cookie(CLIENT_COOKIE, secrets.token_urlsafe(16), httponly=True, samesite="Lax")
+        return response
+
+    def init_app(self, server: flask.Flask):
+        if not SINGLE_FLIGHT_ENABLED:
+            return
+
+        server.after_request(self._after_request)
+
+
+SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,181 @@
+import base64
+import binascii
+import io
+import logging
+import os
+import warnings
+from typing import *
+
+import numpy as np
+
+from utils import memoization
+
+logger = logging.getLogger("upload-utils-logger")
+logger.setLevel(logging.INFO)
+
+# decoded file size, the base64 request body is about 4/3 of this
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+# text has to be parsed number by number, so it gets a tighter budget than binary formats
+UPLOAD_MAX_TEXT_BYTES = int(os.environ.get("UPLOAD_MAX_TEXT_BYTES", str(16 * 1024 * 1024)))
+UPLOAD_MAX_ENTRIES = int(os.environ.get("UPLOAD_MAX_ENTRIES", str(8 * 1024 * 1024)))
+TEXT_EXTENSIONS = [".csv", ".txt"]
+RAW_DTYPES = {".bin": "<f8", ".raw": "<f8", ".f64": "<f8", ".f32": "<f4"}
+UPLOAD_EXTENSIONS = [".npy", *TEXT_EXTENSIONS, *RAW_DTYPES]
+# parsed uploads stay on the server and the page only holds their key, so a file is sent and parsed once
+UPLOAD_MEMORY_BYTES = int(os.environ.get("UPLOAD_MEMORY_BYTES", str(128 * 1024 * 1024)))
+# the next slider move may land on another worker, so they are also written where every worker can read them
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/tmp/eigenvo_uploads")
+UPLOAD_DISK_ENABLED = os.environ.get("UPLOAD_DISK", "1") == "1"
+UPLOAD_DISK_BYTES = int(os.environ.get("UPLOAD_DISK_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_TTL = float(os.environ.get("UPLOAD_TTL", str(24 * 60 * 60)))
+
+
+def max_request_bytes() -> int:
+    # base64 inflates by 4/3, leave room for the rest of the callback payload
+    return UPLOAD_MAX_BYTES * 4 // 3 + 1024 * 1024
+
+
+def decode_contents(contents: str, max_bytes: int = UPLOAD_MAX_BYTES) -> bytes:
+    # dcc.Upload sends "data:<mime>;base64,<data>", the size is checked before anything is decoded
+    _, _, encoded = contents.partition(",")
+    if len(encoded) * 3 // 4 > max_bytes:
+        raise ValueError(f"files of this type are limited to {max_bytes // (1024 * 1024)} MB")
+
+    try:
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("the upload is not valid base64")
+
+
+def parse_npy(data: bytes) -> np.ndarray:
+    buffer = io.BytesIO(data)
+    try:
+        major, _ = np.lib.format.read_magic(buffer)
+        if major == 1:
+            shape, _, dtype = np.lib.format.read_array_header_1_0(buffer)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(buffer)
+    except ValueError as e:
+        raise ValueError(f"not a valid .npy file ({e})")
+
+    if dtype.kind not in "fiu":
+        raise ValueError(f"expected a numeric array, got {dtype}")
+
+    count = int(np.prod(shape))
+    if count > UPLOAD_MAX_ENTRIES:
+        raise ValueError(f"vectors are limited to {UPLOAD_MAX_ENTRIES:,} entries")
+    if buffer.tell() + count * dtype.itemsize > len(data):
+        raise ValueError("the .npy file is truncated")
+
+    # a view over the decoded bytes, memory order does not matter for a norm
+    return np.frombuffer(data, dtype=dtype, count=count, offset=buffer.tell())
+
+
+def parse_text(data: bytes) -> np.ndarray:
+    # numpy parses the numbers in C, commas, semicolons and any whitespace separate entries
+    text = data.decode("utf-8", errors="replace").translate(str.maketrans(",;", "  ")).strip()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        try:
+            vector = np.fromstring(text, dtype=np.float64, sep=" ")
+        except (DeprecationWarning, ValueError):
+            raise ValueError("could not parse every entry as a number")
+
+    if vector.size > UPLOAD_MAX_ENTRIES:
+        raise ValueError(f"vectors are limited to {UPLOAD_MAX_ENTRIES:,} entries")
+    return vector
+
+
+def parse_raw(data: bytes, dtype: str) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    if len(data) % dtype.itemsize:
+        raise ValueError(f"raw {dtype} files must be a multiple of {dtype.itemsize} bytes")
+    if len(data) // dtype.itemsize > UPLOAD_MAX_ENTRIES:
+        raise ValueError(f"vectors are limited to {UPLOAD_MAX_ENTRIES:,} entries")
+    return np.frombuffer(data, dtype=dtype)
+
+
+def upload_to_numpy(contents: str, filename: Optional[str]) -> np.ndarray:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in UPLOAD_EXTENSIONS:
+        raise ValueError(f"unsupported file type, use one of {', '.join(UPLOAD_EXTENSIONS)}")
+
+    if extension in TEXT_EXTENSIONS:
+        data = decode_contents(contents, min(UPLOAD_MAX_TEXT_BYTES, UPLOAD_MAX_BYTES))
+    else:
+        data = decode_contents(contents)
+
+    if extension == ".npy":
+        vector = parse_npy(data)
+    elif extension in TEXT_EXTENSIONS:
+        vector = parse_text(data)
+    else:
+        vector = parse_raw(data, RAW_DTYPES[extension])
+
+    if vector.size == 0:
+        raise ValueError("the file holds no entries")
+    if vector.dtype.kind == "f" and not np.isfinite(vector).all():
+        raise ValueError("the vector contains NaN or infinite entries")
+
+    logger.info(f"Parsed {vector.size} entries ({vector.dtype}) from {filename}")
+    return vector
+
+
+class UploadStore:
+    def __init__(
+            self,
+            memory: memoization.MemoryTier = None,
+            disk: Optional[memoization.DiskTier] = None
+    ):
+        self.memory = memory if memory is not None else memoization.MemoryTier(UPLOAD_MEMORY_BYTES)
+        self.disk = disk
+
+    @staticmethod
+    def make_key(contents: str, filename: Optional[str]) -> str:
+        return memoization.canonical_hash(filename, contents)
+
+    def put(self, contents: str, filename: Optional[str]) -> Tuple[str, np.ndarray]:
+        # uploading the same file again reuses the vector parsed the first time
+        key = self.make_key(contents, filename)
+        vector = self.get(key)
+        if vector is not None:
+            return key, vector
+
+        vector = upload_to_numpy(contents, filename)
+        self.memory.put(key, vector, vector.nbytes)
+        if self.disk is not None:
+            buffer = io.BytesIO()
+            np.save(buffer, vector, allow_pickle=False)
+            try:
+                self.disk.put(key, buffer.getvalue())
+            except OSError as e:
+                logger.warning(f"Could not write upload {key[:12]} to {self.disk.directory}: {e}")
+        return key, vector
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is not memoization.MISSING:
+            return vector
+
+        if self.disk is None:
+            return None
+        data, _ = self.disk.get(key)
+        if data is None:
+            return None
+        try:
+            vector = parse_npy(data)
+        except ValueError as e:
+            logger.warning(f"Dropping unreadable upload {key[:12]}: {e}")
+            return None
+        self.memory.put(key, vector, vector.nbytes)
+        return vector
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+UPLOADS = UploadStore(
+    disk=memoization.DiskTier(UPLOAD_DIR, UPLOAD_DISK_BYTES, UPLOAD_TTL, suffix=".npy") if UPLOAD_DISK_ENABLED else None
+)